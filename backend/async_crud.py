@@ -0,0 +1,189 @@
+"""
+async_crud.py
+
+Async counterparts of the functions in crud.py for endpoints declared with 'async def'.
+They take an AsyncSession (see database.AsyncSessionLocal), so the database round trips
+don't block the event loop. The conversion to the Pydantic schemas and the cache
+invalidation work exactly as in crud.py.
+
+The admin endpoints and the public read endpoints are plain 'def' functions that run
+in the threadpool and keep using crud.py.
+
+Sections:
+- Seminar actions
+- Participant actions
+"""
+
+from sqlalchemy import select, update, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from fastapi import HTTPException
+from models import Seminar, Participant
+from schemas import ParticipantAdd, SeminarOut
+from email_functions import build_unregistered_email
+from cache import invalidate_on_commit
+from crud import to_seminar_out
+import outbox
+import uuid
+
+
+# ---------------------------------------------------------------------------- #
+#                                SEMINAR ACTIONS                               #
+# ---------------------------------------------------------------------------- #
+async def get_seminar_by_id(db: AsyncSession, seminar_id: int) -> SeminarOut:
+    """
+    Fetch a single seminar by its id.
+
+    Args:
+        db (AsyncSession): SQLAlchemy async database session.
+        seminar_id (int): ID of the seminar.
+
+    Raises:
+        HTTPException 404: When an invalid ID is given.
+
+    Returns:
+        SeminarOut: information about the seminar, including LocationOut and number of participants.
+    """
+    result = await db.execute(
+        select(Seminar)
+        .options(joinedload(Seminar.location))
+        .where(Seminar.seminar_id == seminar_id)
+    )
+    seminar = result.scalars().first()
+
+    if not seminar:
+        raise HTTPException(status_code=404, detail=f"Seminar with id={seminar_id} not found.")
+
+    return to_seminar_out(seminar)
+
+
+# ---------------------------------------------------------------------------- #
+#                              PARTICIPANT ACTIONS                             #
+# ---------------------------------------------------------------------------- #
+async def _change_participants_count(db: AsyncSession, seminar_id: int, delta: int):
+    """
+    Atomically change 'Seminar.participants_count' within the current transaction.
+    """
+    invalidate_on_commit(db, "seminars", f"seminar:{seminar_id}")
+    await db.execute(
+        update(Seminar)
+        .where(Seminar.seminar_id == seminar_id)
+        .values(participants_count=Seminar.participants_count + delta, revision=Seminar.revision + 1)
+    )
+
+async def _reserve_seat(db: AsyncSession, seminar_id: int):
+    """
+    Atomically take one seat of a seminar within the current transaction (see crud._reserve_seat).
+
+    Raises:
+        HTTPException 404: If the seminar does not exist.
+        HTTPException 409: If the seminar is fully booked.
+    """
+    result = await db.execute(
+        update(Seminar)
+        .where(
+            Seminar.seminar_id == seminar_id,
+            or_(Seminar.max_participants.is_(None), Seminar.participants_count < Seminar.max_participants),
+        )
+        .values(participants_count=Seminar.participants_count + 1, revision=Seminar.revision + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if not result.rowcount:
+        if not await db.get(Seminar, seminar_id):
+            raise HTTPException(status_code=404, detail=f"Seminar with id={seminar_id} not found.")
+        raise HTTPException(status_code=409, detail="Seminar is fully booked.")
+
+    invalidate_on_commit(db, "seminars", f"seminar:{seminar_id}")
+
+async def add_participant(db: AsyncSession, participant: ParticipantAdd, commit: bool = True) -> Participant:
+    """
+    Add a participant with the associated seminar_id to the database.
+
+    Args:
+        db (AsyncSession): SQLAlchemy async database session.
+        participant (ParticipantAdd): Participant to add.
+        commit (bool, optional): If False, the participant is only flushed so the caller can
+            add more changes (e.g. queued emails) to the same transaction. Defaults to True.
+
+    Raises:
+        HTTPException 404: If the seminar does not exist.
+        HTTPException 409: If the seminar is fully booked.
+
+    Returns:
+        Participant: The added participant.
+    """
+    # Take a seat first, the seminar row stays locked until the transaction ends
+    await _reserve_seat(db, participant.seminar_id)
+
+    participant = Participant(
+        firstname=participant.firstname,
+        lastname=participant.lastname,
+        email=participant.email,
+        remarks=participant.remarks,
+        seminar_id=participant.seminar_id,
+        token=str(uuid.uuid4())
+    )
+    db.add(participant)
+
+    if commit:
+        await db.commit()
+        await db.refresh(participant)
+    else:
+        await db.flush()
+    return participant
+
+async def get_participants(db: AsyncSession, seminar_id: int) -> list[Participant]:
+    """
+    Retrieve all participants of a single seminar.
+
+    Args:
+        db (AsyncSession): SQLAlchemy async database session.
+        seminar_id (int): ID of the seminar that the participants registered for.
+
+    Raises:
+        HTTPException 404: If an invalid seminar_id is given.
+
+    Returns:
+        List[Participant]: List of participants.
+    """
+    if not await db.get(Seminar, seminar_id):
+        raise HTTPException(status_code=404, detail=f"Seminar with the id={seminar_id} does not exist. Failed to retrieve participants.")
+
+    result = await db.execute(
+        select(Participant)
+        .where(Participant.seminar_id == seminar_id)
+        .order_by(Participant.firstname)
+    )
+    return list(result.scalars().all())
+
+async def unregister_participant(db: AsyncSession, token: str) -> str:
+    """
+    Unregister (delete) a participant using the participants token.
+
+    Args:
+        db (AsyncSession): SQLAlchemy async database session.
+        token (str): Token of the participant to delete.
+
+    Raises:
+        HTTPException 404: If the token does not exist in the database.
+
+    Returns:
+        str: Success message in German.
+    """
+    result = await db.execute(select(Participant).where(Participant.token == token))
+    participant = result.scalars().first()
+
+    if not participant:
+        raise HTTPException(status_code=404, detail="Ungültiger Link oder Teilnehmer bereits abgemeldet.")
+
+    seminar = await get_seminar_by_id(db, participant.seminar_id)
+
+    # Info email to the admin is sent by the outbox worker once the deletion is committed
+    outbox.enqueue_email(db, build_unregistered_email(participant, seminar))
+
+    await db.delete(participant)
+    await _change_participants_count(db, participant.seminar_id, -1)
+    await db.commit()
+    outbox.worker.wake()
+
+    return "Sie wurden erfolgreich vom Seminar abgemeldet."
@@ -7,16 +7,35 @@ It is specifically designed to secure the admin area of the application.
 Functions:
 - verify_password: Verifies a plain password against a hashed password.
 - authenticate_admin: Authenticates an admin user based on credentials.
+- authenticate_admin_async: Runs authenticate_admin in the dedicated password executor.
 - create_access_token: Generates a signed JWT token with expiration time.
 - get_current_admin: Validates the access token from the request's cookie and returns the username.
 - check_admin_token: Validator to confirm admin status from a token.
+- revoke_token: Invalidates a token on logout.
+
+Verified tokens are cached for up to TOKEN_CACHE_TTL seconds (never beyond their expiry),
+so the many admin requests of a dashboard page don't verify the same signature again and again.
+Tokens revoked on logout are stored in the 'revoked_tokens' table and rejected by every uvicorn
+worker until they expire. The table is only checked when a token isn't in the cache, so a cache
+hit needs neither the signature nor the database. The worker handling the logout drops the token
+from its cache right away, the other workers reject it after at most TOKEN_CACHE_TTL seconds.
 """
 
 from fastapi import HTTPException, Request
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
 from crypt import pwd_context
+from concurrent.futures import ThreadPoolExecutor
+from cache import TTLCache
+from database import SessionLocal
+from models import RevokedToken
+import asyncio
+import hashlib
+import logging
 import os
+import tempfile
+import threading
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -28,6 +47,30 @@ SECRET = os.getenv('SECRET_KEY')
 # Admin Login
 ADMIN_USERNAME = os.getenv('ADMIN_USERNAME')
 ADMIN_PASSWORD_HASH = os.getenv('ADMIN_PASSWORD_HASH')
+# Optional file with the password hash, takes precedence over ADMIN_PASSWORD_HASH and
+# receives the new hash when the bcrypt cost (crypt.BCRYPT_ROUNDS) changed
+ADMIN_PASSWORD_HASH_FILE = os.getenv('ADMIN_PASSWORD_HASH_FILE')
+
+# Password hashing runs in its own small thread pool, so bcrypt can neither block the event loop
+# nor occupy the threads serving other requests. Logins beyond the pending limit are rejected.
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 1))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', 8))
+
+logger = logging.getLogger(__name__)
+
+if ADMIN_PASSWORD_HASH_FILE and os.path.exists(ADMIN_PASSWORD_HASH_FILE):
+    with open(ADMIN_PASSWORD_HASH_FILE) as file:
+        ADMIN_PASSWORD_HASH = file.read().strip()
+
+# Verified tokens
+TOKEN_CACHE_TTL = float(os.getenv('TOKEN_CACHE_TTL', 10))                 # seconds, delay of a logout in other workers
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv('TOKEN_CACHE_MAX_ENTRIES', 256))
+
+_verified_tokens = TTLCache(ttl=TOKEN_CACHE_TTL, max_entries=TOKEN_CACHE_MAX_ENTRIES)
+
+_password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password")
+_password_slots = threading.BoundedSemaphore(PASSWORD_HASH_MAX_PENDING)
+_rehash_lock = threading.Lock()
 
 def verify_password(password: str, hash: str) -> bool:
     """
@@ -53,9 +96,60 @@ def authenticate_admin(username: str, password: str) -> dict | None:
     Returns:
         dict | None: Dict with username if successful, else None.
     """
-    if username == ADMIN_USERNAME and verify_password(password=password, hash=ADMIN_PASSWORD_HASH):
-        return {"username": ADMIN_USERNAME}
-    return None
+    if username != ADMIN_USERNAME:
+        return None
+
+    valid, new_hash = pwd_context.verify_and_update(password, ADMIN_PASSWORD_HASH)
+    if not valid:
+        return None
+    if new_hash:
+        _update_admin_password_hash(new_hash)
+    return {"username": ADMIN_USERNAME}
+
+def _update_admin_password_hash(new_hash: str):
+    """
+    Replace the admin password hash after the bcrypt cost changed. The new hash is used
+    right away and written to ADMIN_PASSWORD_HASH_FILE (if set), so it survives a restart.
+    """
+    global ADMIN_PASSWORD_HASH
+    with _rehash_lock:
+        ADMIN_PASSWORD_HASH = new_hash
+        if not ADMIN_PASSWORD_HASH_FILE:
+            logger.warning("Admin password hash uses a different bcrypt cost, set ADMIN_PASSWORD_HASH "
+                           "or ADMIN_PASSWORD_HASH_FILE to keep the rehashed value.")
+            return
+
+        # Write to a temporary file first, so the file is never left half written
+        directory = os.path.dirname(os.path.abspath(ADMIN_PASSWORD_HASH_FILE))
+        with tempfile.NamedTemporaryFile("w", dir=directory, delete=False) as file:
+            file.write(new_hash)
+        os.replace(file.name, ADMIN_PASSWORD_HASH_FILE)
+        logger.info("Admin password rehashed with the configured bcrypt cost.")
+
+async def authenticate_admin_async(username: str, password: str) -> dict | None:
+    """
+    Validates the login credentials in the password executor without blocking the event loop.
+
+    Args:
+        username (str): Username.
+        password (str): Plain password.
+
+    Raises:
+        HTTPException 503: If PASSWORD_HASH_MAX_PENDING logins are already being verified.
+
+    Returns:
+        dict | None: Dict with username if successful, else None.
+    """
+    if not _password_slots.acquire(blocking=False):
+        raise HTTPException(status_code=503, detail="Too many login attempts, please try again later.")
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_password_executor, authenticate_admin, username, password)
+    finally:
+        _password_slots.release()
+
+def shutdown_password_executor():
+    _password_executor.shutdown(wait=False)
 
 def create_access_token(data: dict, expires_delta: timedelta = 120) -> str:
     """
@@ -73,6 +167,66 @@ def create_access_token(data: dict, expires_delta: timedelta = 120) -> str:
     to_encode.update({"exp": expires})
     return jwt.encode(to_encode, SECRET, algorithm=ALGORITHM)
 
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def _verify_token(token: str) -> dict:
+    """
+    Verify an access token, using the cache of already verified tokens.
+
+    Raises:
+        HTTPException 401: If the token is invalid, expired, revoked or the subject
+        doesn't match the admin username.
+
+    Returns:
+        dict: The payload of the token.
+    """
+    key = _token_key(token)
+    payload = _verified_tokens.get(key)
+    if payload is not None and payload.get("exp", float("inf")) > time.time():
+        return payload
+
+    if _is_revoked(key):
+        raise HTTPException(status_code=401)
+
+    try:
+        payload = jwt.decode(token, SECRET, algorithms=[ALGORITHM])
+    except JWTError:
+        raise HTTPException(status_code=401)
+    if payload.get("sub") != ADMIN_USERNAME:
+        raise HTTPException(status_code=401)
+
+    ttl = min(TOKEN_CACHE_TTL, payload.get("exp", float("inf")) - time.time())
+    if ttl > 0:
+        _verified_tokens.set(key, payload, ttl=ttl)
+    return payload
+
+def _is_revoked(key: str) -> bool:
+    with SessionLocal() as db:
+        return db.query(RevokedToken.token_hash).filter(
+            RevokedToken.token_hash == key, RevokedToken.expires_at > time.time()
+        ).first() is not None
+
+def revoke_token(token: str):
+    """
+    Invalidate an access token (on logout), it's rejected by all workers until it expires.
+
+    Args:
+        token (str): The access token.
+    """
+    key = _token_key(token)
+    try:
+        expires = jwt.get_unverified_claims(token).get("exp", time.time() + TOKEN_CACHE_TTL)
+    except JWTError:
+        return
+
+    with SessionLocal() as db:
+        # Forget revocations of tokens that expired anyway
+        db.query(RevokedToken).filter(RevokedToken.expires_at <= time.time()).delete(synchronize_session=False)
+        db.merge(RevokedToken(token_hash=key, expires_at=int(expires)))
+        db.commit()
+    _verified_tokens.pop(key)
+
 def get_current_admin(request: Request) -> dict:
     """
     Validates the admin session based on the access token in the cookie.
@@ -91,14 +245,8 @@ def get_current_admin(request: Request) -> dict:
     if not token:
         raise HTTPException(status_code=401)
 
-    try:
-        payload = jwt.decode(token, SECRET, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        if username != ADMIN_USERNAME:
-            raise HTTPException(status_code=401)
-        return {"username": username}
-    except JWTError:
-        raise HTTPException(status_code=401)
+    payload = _verify_token(token)
+    return {"username": payload["sub"]}
     
 def check_admin_token(token: str) -> dict:
     """
@@ -108,16 +256,11 @@ def check_admin_token(token: str) -> dict:
         token (str): The access token.
 
     Raises:
-        HTTPException 401: If the token is invalid or the subject doesn't
+        HTTPException 401: If the token is invalid, revoked or the subject doesn't
         match the admin's username. 
 
     Returns:
         dict: Containing a status ('ok').
     """
-    try:
-        payload = jwt.decode(token, SECRET, algorithms=[ALGORITHM])
-        if payload.get("sub") != ADMIN_USERNAME:
-            raise HTTPException(status_code=401)
-    except:
-        raise HTTPException(status_code=401)
-    return {"status": "ok"}
\ No newline at end of file
+    _verify_token(token)
+    return {"status": "ok"}
@@ -0,0 +1,71 @@
+"""
+certificates.py
+
+Benchmark of the certificate rendering (certificate_utils.py) for growing numbers of participants.
+Measures the time per certificate of a single process render and of the parallel render
+(render process pool + merge), which should both stay flat as the number of participants grows.
+
+Run from the backend directory:
+    python benchmarks/certificates.py --sizes 10 100 1000 5000
+"""
+
+from datetime import date, time
+from pathlib import Path
+import argparse
+import sys
+import time as clock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from schemas import LocationOut, ParticipantOut, SeminarOut
+from render_pool import get_render_pool, shutdown_render_pool
+import certificate_utils
+
+
+def make_seminar() -> SeminarOut:
+    return SeminarOut(
+        seminar_id=1,
+        title="Benchmark Seminar mit einem etwas längeren Titel über mehrere Zeilen",
+        description="",
+        date=date(2025, 5, 17),
+        time=time(10),
+        url=None,
+        max_participants=None,
+        price=None,
+        image_name=None,
+        participants_count=0,
+        location=LocationOut(location_id=1, name="Haus", street="Hauptstraße", house_number=1,
+                             zip_code=12345, city="München", remarks=None, maps_url=None),
+    )
+
+def make_participants(count: int) -> list[ParticipantOut]:
+    return [
+        ParticipantOut(participant_id=i, firstname=f"Vorname{i}", lastname=f"Nachname{i}",
+                       email=f"participant{i}@example.com", remarks=None, token=str(i))
+        for i in range(count)
+    ]
+
+def measure(function, *args) -> float:
+    start = clock.perf_counter()
+    function(*args)
+    return clock.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the certificate rendering.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 5000], help="Numbers of participants")
+    args = parser.parse_args()
+
+    seminar = make_seminar()
+
+    # Start the worker processes before measuring
+    get_render_pool().submit(certificate_utils.render_certificates_pdf, seminar, make_participants(1)).result()
+
+    print(f"{'participants':>12} {'single ms/cert':>15} {'parallel ms/cert':>17} {'parallel total s':>17}")
+    for size in args.sizes:
+        participants = make_participants(size)
+        single = measure(certificate_utils.render_certificates_pdf, seminar, participants)
+        parallel = measure(certificate_utils.generate_certificates_pdf, seminar, participants)
+        print(f"{size:>12} {single / size * 1000:>15.3f} {parallel / size * 1000:>17.3f} {parallel:>17.2f}")
+
+    shutdown_render_pool()
@@ -0,0 +1,90 @@
+"""
+login.py
+
+Benchmark of the admin login against public traffic on the same event loop.
+
+A simulated public request (a short coroutine) runs every few milliseconds while a burst of
+concurrent logins is verified, once with bcrypt called directly on the event loop (the old
+behaviour) and once through auth.authenticate_admin_async. The delay of the public requests
+shows how much the logins stall the site, the login latency shows what the admin waits.
+
+Run from the backend directory:
+    python benchmarks/login.py --rounds 12 --logins 8
+"""
+
+from pathlib import Path
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+parser = argparse.ArgumentParser(description="Benchmark the admin login.")
+parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost")
+parser.add_argument("--logins", type=int, default=8, help="Concurrent login attempts")
+parser.add_argument("--interval", type=float, default=0.005, help="Seconds between simulated public requests")
+args = parser.parse_args()
+
+os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+os.environ.setdefault("ADMIN_USERNAME", "admin")
+os.environ.pop("ADMIN_PASSWORD_HASH_FILE", None)
+# auth imports the database module, the login itself doesn't use it
+os.environ.setdefault("DB_URL", "sqlite://")
+
+import auth
+from crypt import pwd_context
+
+auth.ADMIN_USERNAME = os.environ["ADMIN_USERNAME"]
+auth.ADMIN_PASSWORD_HASH = pwd_context.hash("benchmark")
+
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+async def public_traffic(stop: asyncio.Event, delays: list[float]):
+    """
+    Record how late each simulated public request gets to run.
+    """
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + args.interval
+        await asyncio.sleep(args.interval)
+        delays.append(max(0.0, loop.time() - expected))
+
+async def login_inline() -> float:
+    start = time.perf_counter()
+    auth.authenticate_admin(auth.ADMIN_USERNAME, "benchmark")
+    return time.perf_counter() - start
+
+async def login_offloaded() -> float:
+    start = time.perf_counter()
+    try:
+        await auth.authenticate_admin_async(auth.ADMIN_USERNAME, "benchmark")
+    except Exception:
+        pass    # rejected because of PASSWORD_HASH_MAX_PENDING
+    return time.perf_counter() - start
+
+async def run(login) -> tuple[list[float], list[float]]:
+    stop = asyncio.Event()
+    delays = []
+    traffic = asyncio.create_task(public_traffic(stop, delays))
+    await asyncio.sleep(0.05)
+    latencies = await asyncio.gather(*(login() for _ in range(args.logins)))
+    stop.set()
+    await traffic
+    return delays, latencies
+
+
+if __name__ == "__main__":
+    print(f"bcrypt cost {args.rounds}, {args.logins} concurrent logins, "
+          f"{auth.PASSWORD_HASH_WORKERS} password worker(s), max {auth.PASSWORD_HASH_MAX_PENDING} pending")
+    print(f"{'mode':>10} {'public p50 ms':>14} {'public p99 ms':>14} {'public max ms':>14} {'login p50 ms':>13} {'login max ms':>13}")
+    for name, login in (("inline", login_inline), ("offloaded", login_offloaded)):
+        delays, latencies = asyncio.run(run(login))
+        print(f"{name:>10} {statistics.median(delays) * 1000:>14.1f} {percentile(delays, 0.99) * 1000:>14.1f} "
+              f"{max(delays) * 1000:>14.1f} {statistics.median(latencies) * 1000:>13.1f} {max(latencies) * 1000:>13.1f}")
+    auth.shutdown_password_executor()
@@ -0,0 +1,149 @@
+"""
+seed.py
+
+Fills a database with a synthetic seminar catalog for benchmarks: locations, seminars spread
+from several years in the past to one year in the future and participants distributed over
+them. The counters (participants_count) are consistent, the participant tokens are
+'bench-<participant_id>' so benchmarks can unregister known participants.
+
+The rows are written with bulk inserts (SQLAlchemy Core, BATCH_SIZE rows per statement), a
+catalog of 10,000 seminars with 1,000,000 participants takes well under a minute on SQLite.
+All tables of the given database are dropped and recreated.
+
+Functions:
+- seed_database: Creates the tables and inserts the synthetic catalog.
+
+Run from the backend directory:
+    python benchmarks/seed.py --db-url sqlite:////tmp/seminars_benchmark.db --seminars 10000 --participants 1000000
+"""
+
+from datetime import date, time, timedelta
+from pathlib import Path
+import argparse
+import os
+import random
+import sys
+import time as clock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+BATCH_SIZE = 10_000
+PAST_DAYS = 3 * 365
+FUTURE_DAYS = 365
+
+TOPICS = ["Yoga", "Meditation", "Achtsamkeit", "Atemarbeit", "Qigong", "Stressbewältigung", "Ernährung",
+          "Kommunikation", "Selbstfürsorge", "Resilienz", "Klangschalen", "Waldbaden", "Tanz", "Entspannung"]
+LEVELS = ["für Anfänger", "für Fortgeschrittene", "Intensivkurs", "Wochenendseminar", "Workshop", "Abendkurs"]
+CITIES = ["Freiburg", "Stuttgart", "München", "Karlsruhe", "Basel", "Offenburg", "Konstanz", "Ulm",
+          "Heidelberg", "Mannheim", "Überlingen", "Lörrach", "Tübingen", "Augsburg", "Zürich"]
+WORDS = ("Übungen Körper Atem Ruhe Gruppe Praxis Einführung Vertiefung Alltag Gesundheit Bewegung "
+         "Wahrnehmung Haltung Stille Natur Energie Balance Gelassenheit Klarheit Freude").split()
+FIRSTNAMES = ["Anna", "Lena", "Maria", "Sophie", "Laura", "Paul", "Lukas", "Jonas", "Felix", "Max", "Ursula", "Peter"]
+LASTNAMES = ["Müller", "Schmidt", "Schneider", "Fischer", "Weber", "Meyer", "Wagner", "Becker", "Hoffmann", "Koch"]
+
+
+def _batches(rows, size: int = BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def seed_database(engine, seminars: int, participants: int, locations: int, seed: int = 1) -> dict:
+    """
+    Drop and recreate all tables and insert a synthetic catalog.
+
+    Args:
+        engine: SQLAlchemy engine of the benchmark database.
+        seminars (int): Number of seminars.
+        participants (int): Number of participants, distributed randomly over the seminars.
+        locations (int): Number of locations.
+        seed (int, optional): Seed of the random generator, the same seed gives the same catalog. Defaults to 1.
+
+    Returns:
+        dict: Numbers of inserted rows and the duration in seconds.
+    """
+    from database import Base
+    from models import Location, Participant, Seminar, TableVersion
+
+    rng = random.Random(seed)
+    start = clock.perf_counter()
+    today = date.today()
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    # Participants per seminar first, so the counters and capacities are consistent
+    seminar_of = [rng.randrange(seminars) + 1 for _ in range(participants)]
+    counts = [0] * (seminars + 1)
+    for seminar_id in seminar_of:
+        counts[seminar_id] += 1
+
+    with engine.begin() as connection:
+        connection.execute(TableVersion.__table__.insert(), [
+            {"table_name": name, "version": 0} for name in ("seminars", "locations", "participants")
+        ])
+        connection.execute(Location.__table__.insert(), [
+            {"location_id": i, "name": f"Seminarhaus {i}", "street": "Hauptstraße", "house_number": str(i % 200 + 1),
+             "zip_code": 10000 + i, "city": CITIES[i % len(CITIES)], "remarks": None, "maps_url": None}
+            for i in range(1, locations + 1)
+        ])
+
+        def seminar_rows():
+            for i in range(1, seminars + 1):
+                # Every third seminar is unlimited, the others keep a few free places in the future
+                capacity = None if i % 3 == 0 else counts[i] + rng.randint(0, 5)
+                yield {
+                    "seminar_id": i,
+                    "title": f"{rng.choice(TOPICS)} {rng.choice(LEVELS)}",
+                    "description": " ".join(rng.choices(WORDS, k=rng.randint(20, 60))),
+                    "date": today + timedelta(days=rng.randint(-PAST_DAYS, FUTURE_DAYS)),
+                    "time": time(rng.choice([9, 10, 14, 18])),
+                    "url": None,
+                    "max_participants": capacity,
+                    "price": rng.choice([None, 25.0, 49.0, 89.0, 150.0]),
+                    "image_name": None,
+                    "participants_count": counts[i],
+                    "revision": 0,
+                    "location_id": rng.randint(1, locations) if locations else None,
+                }
+
+        for batch in _batches(seminar_rows()):
+            connection.execute(Seminar.__table__.insert(), batch)
+
+        def participant_rows():
+            for i, seminar_id in enumerate(seminar_of, start=1):
+                firstname, lastname = rng.choice(FIRSTNAMES), rng.choice(LASTNAMES)
+                yield {
+                    "participant_id": i,
+                    "firstname": firstname,
+                    "lastname": lastname,
+                    "email": f"{firstname.lower()}.{i}@example.com",
+                    "remarks": None,
+                    "token": f"bench-{i}",
+                    "seminar_id": seminar_id,
+                }
+
+        for batch in _batches(participant_rows()):
+            connection.execute(Participant.__table__.insert(), batch)
+
+    return {"seminars": seminars, "participants": participants, "locations": locations,
+            "seconds": round(clock.perf_counter() - start, 2)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed a database with a synthetic seminar catalog.")
+    parser.add_argument("--db-url", required=True, help="Database URL, all tables are dropped and recreated")
+    parser.add_argument("--seminars", type=int, default=10_000)
+    parser.add_argument("--participants", type=int, default=1_000_000)
+    parser.add_argument("--locations", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    os.environ["DB_URL"] = args.db_url
+    from database import engine
+
+    print(seed_database(engine, args.seminars, args.participants, args.locations, args.seed))
@@ -0,0 +1,126 @@
+"""
+smtp_sink.py
+
+Minimal local SMTP server that accepts every message and only counts it, so the outbox can
+deliver the registration and contact emails during benchmarks without a real mail server.
+It speaks plain SMTP (run the backend with SMTP_USE_SSL=false) and accepts any AUTH PLAIN login.
+
+Classes:
+- SMTPSink: The SMTP server, running on its own event loop in a background thread.
+
+Run standalone (e.g. for manual tests against a local backend):
+    python benchmarks/smtp_sink.py --port 2525
+"""
+
+import argparse
+import asyncio
+import threading
+import time
+
+
+class SMTPSink:
+    """
+    SMTP server discarding all messages. 'messages' and 'bytes' count what was received.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port            # 0 picks a free port, the actual one is set by start()
+        self.messages = 0
+        self.bytes = 0
+        self._loop = None
+        self._server = None
+        self._thread = None
+
+    def start(self) -> "SMTPSink":
+        """
+        Start the server in a background thread and wait until it accepts connections.
+        """
+        ready = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._server = self._loop.run_until_complete(asyncio.start_server(self._handle, self.host, self.port))
+            self.port = self._server.sockets[0].getsockname()[1]
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name="smtp-sink", daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def stop(self):
+        self._loop.call_soon_threadsafe(self._server.close)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    def wait_for(self, count: int, timeout: float) -> bool:
+        """
+        Wait until at least 'count' messages were received.
+
+        Returns:
+            bool: False if the timeout expired first.
+        """
+        deadline = time.monotonic() + timeout
+        while self.messages < count:
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        def reply(line: str):
+            writer.write(line.encode() + b"\r\n")
+
+        reply("220 localhost SMTP sink")
+        try:
+            while line := await reader.readline():
+                command = line[:4].upper()
+                if command == b"EHLO":
+                    reply("250-localhost")
+                    reply("250-AUTH PLAIN")
+                    reply("250 8BITMIME")
+                elif command == b"HELO":
+                    reply("250 localhost")
+                elif command == b"AUTH":
+                    reply("235 2.7.0 Authentication successful")
+                elif command == b"DATA":
+                    reply("354 End data with <CR><LF>.<CR><LF>")
+                    await writer.drain()
+                    size = 0
+                    while (data := await reader.readline()) not in (b".\r\n", b""):
+                        size += len(data)
+                    self.messages += 1
+                    self.bytes += size
+                    reply("250 OK")
+                elif command == b"QUIT":
+                    reply("221 Bye")
+                    break
+                elif command in (b"MAIL", b"RCPT", b"RSET", b"NOOP"):
+                    reply("250 OK")
+                else:
+                    reply("502 Command not implemented")
+                await writer.drain()
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local SMTP server discarding all messages.")
+    parser.add_argument("--port", type=int, default=2525)
+    args = parser.parse_args()
+
+    sink = SMTPSink(port=args.port).start()
+    print(f"SMTP sink listening on {sink.host}:{sink.port}, Ctrl+C to stop")
+    try:
+        while True:
+            received = sink.messages
+            time.sleep(5)
+            if sink.messages != received:
+                print(f"{sink.messages} message(s) received")
+    except KeyboardInterrupt:
+        sink.stop()
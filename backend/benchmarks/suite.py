@@ -0,0 +1,324 @@
+"""
+suite.py
+
+Load and latency benchmark of the main endpoints against a real server process.
+
+The suite seeds a benchmark database with a synthetic catalog (see seed.py), starts a local
+SMTP sink (see smtp_sink.py) and the backend with uvicorn, then runs one scenario after the
+other with a fixed number of concurrent clients:
+
+- listing:      GET /seminars/ (random pages)
+- detail:       GET /seminar/{id}
+- registration: POST /seminars/{id}/register (future seminars without participant limit)
+- unregister:   GET /seminars/{id}/unregister (seeded participants)
+- pdf:          GET /admin/seminars/{id}/participants/pdf (logged in admin)
+
+For every scenario p50/p95/p99/max latency, throughput and errors are reported and saved as
+JSON in benchmarks/results/, together with the git commit and the settings. With --compare
+the results are compared to an earlier run, --max-regression makes the suite fail (exit code 1)
+if the p95 latency of a scenario got worse by more than the given percentage.
+
+Run from the backend directory:
+    python benchmarks/suite.py --seminars 10000 --participants 1000000 --locations 300
+    python benchmarks/suite.py --reuse-db --compare benchmarks/results/<earlier run>.json --max-regression 20
+"""
+
+from datetime import date, datetime
+from pathlib import Path
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import secrets
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+parser = argparse.ArgumentParser(description="Load and latency benchmark of the main endpoints.")
+parser.add_argument("--db-url", default=f"sqlite:///{Path(tempfile.gettempdir()) / 'seminars_benchmark.db'}",
+                    help="Benchmark database, all tables are dropped and recreated unless --reuse-db is given")
+parser.add_argument("--reuse-db", action="store_true", help="Skip seeding and use the existing benchmark database")
+parser.add_argument("--seminars", type=int, default=10_000)
+parser.add_argument("--participants", type=int, default=1_000_000)
+parser.add_argument("--locations", type=int, default=300)
+parser.add_argument("--seed", type=int, default=1)
+parser.add_argument("--requests", type=int, default=500, help="Requests per scenario")
+parser.add_argument("--concurrency", type=int, default=20, help="Concurrent clients")
+parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+parser.add_argument("--port", type=int, default=8799)
+parser.add_argument("--scenarios", nargs="+", default=["listing", "detail", "registration", "unregister", "pdf"])
+parser.add_argument("--output", default=str(BACKEND_DIR / "benchmarks" / "results"), help="Directory for the JSON results")
+parser.add_argument("--compare", help="JSON results of an earlier run")
+parser.add_argument("--max-regression", type=float, help="Fail if a p95 latency got worse by more than this percentage")
+args = parser.parse_args()
+
+os.environ["DB_URL"] = args.db_url
+
+import httpx
+from sqlalchemy import create_engine, func, select
+from smtp_sink import SMTPSink
+from seed import seed_database
+
+ADMIN_USERNAME = "benchmark"
+ADMIN_PASSWORD = secrets.token_urlsafe(12)
+
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ---------------------------------------------------------------------------- #
+#                                    SERVER                                    #
+# ---------------------------------------------------------------------------- #
+def start_server(smtp_port: int) -> subprocess.Popen:
+    """
+    Start the backend with the benchmark database, the SMTP sink and a known admin password.
+    """
+    from passlib.context import CryptContext
+
+    env = dict(os.environ)
+    env.pop("ASYNC_DB_URL", None)
+    env.pop("ADMIN_PASSWORD_HASH_FILE", None)
+    env.update({
+        "DB_URL": args.db_url,
+        "SMTP_SERVER": "127.0.0.1",
+        "SMTP_PORT": str(smtp_port),
+        "SMTP_USE_SSL": "false",
+        "EMAIL_USERNAME": "benchmark@example.com",
+        "EMAIL_PASSWORD": "benchmark",
+        "OUTBOX_POLL_INTERVAL": "1",
+        "ALGORITHM": "HS256",
+        "SECRET_KEY": secrets.token_hex(32),
+        "ADMIN_USERNAME": ADMIN_USERNAME,
+        # Low cost, the login isn't part of the measurements
+        "BCRYPT_ROUNDS": "4",
+        "ADMIN_PASSWORD_HASH": CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash(ADMIN_PASSWORD),
+        "IMAGE_WARMUP": "false",
+        # All requests come from one address, the limits would reject most registrations
+        "RATELIMIT_ENABLED": "false",
+    })
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--workers", str(args.workers),
+         "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with code {server.returncode}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{args.port}/seminars/count", timeout=1).status_code == 200:
+                return server
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("Server didn't start within 60 seconds")
+
+def stop_server(server: subprocess.Popen):
+    server.terminate()
+    try:
+        server.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        server.kill()
+
+
+# ---------------------------------------------------------------------------- #
+#                                   SCENARIOS                                  #
+# ---------------------------------------------------------------------------- #
+def load_targets(engine) -> dict:
+    """
+    IDs the scenarios pick their requests from.
+    """
+    from models import Participant, Seminar
+
+    with engine.connect() as connection:
+        seminar_ids = connection.execute(select(Seminar.seminar_id)).scalars().all()
+        open_ids = connection.execute(
+            select(Seminar.seminar_id).where(Seminar.date > date.today(), Seminar.max_participants.is_(None))
+        ).scalars().all()
+        with_participants = connection.execute(
+            select(Seminar.seminar_id).where(Seminar.participants_count > 0)
+        ).scalars().all()
+        # Participants of the seeded catalog only (token 'bench-<id>'), each one is unregistered once
+        unregister = connection.execute(
+            select(Participant.seminar_id, Participant.token)
+            .where(Participant.token.like("bench-%"))
+            .order_by(func.random())
+            .limit(args.requests)
+        ).all()
+    return {"seminars": seminar_ids, "open": open_ids, "with_participants": with_participants,
+            "unregister": list(unregister)}
+
+def make_requests(scenario: str, targets: dict, rng: random.Random) -> list[tuple[str, str, dict]]:
+    """
+    The (method, path, options) of all requests of a scenario.
+    """
+    pages = max(1, min(len(targets["seminars"]) // 10, 100))
+    if scenario == "listing":
+        return [("GET", f"/seminars/?limit=10&offset={rng.randrange(pages) * 10}", {}) for _ in range(args.requests)]
+    if scenario == "detail":
+        return [("GET", f"/seminar/{rng.choice(targets['seminars'])}", {}) for _ in range(args.requests)]
+    if scenario == "registration":
+        return [("POST", f"/seminars/{rng.choice(targets['open'])}/register", {"json": {
+            "firstname": "Bench", "lastname": f"Mark{i}", "email": f"bench.{i}@example.com", "remarks": ""}})
+            for i in range(args.requests)]
+    if scenario == "unregister":
+        return [("GET", f"/seminars/{seminar_id}/unregister", {"params": {"token": token}})
+                for seminar_id, token in targets["unregister"]]
+    if scenario == "pdf":
+        return [("GET", f"/admin/seminars/{rng.choice(targets['with_participants'])}/participants/pdf", {})
+                for _ in range(args.requests)]
+    raise ValueError(f"Unknown scenario '{scenario}'")
+
+async def run_scenario(client: httpx.AsyncClient, requests: list[tuple[str, str, dict]]) -> dict:
+    """
+    Send the requests with 'args.concurrency' concurrent clients and measure each one.
+    """
+    latencies = []
+    statuses = {}
+    pending = iter(requests)
+
+    async def worker():
+        for method, path, options in pending:
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, **options)
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    duration = time.perf_counter() - start
+
+    if not latencies:
+        return {"requests": 0}
+    return {
+        "requests": len(latencies),
+        "errors": sum(count for status, count in statuses.items() if not status.startswith("2")),
+        "status_codes": statuses,
+        "throughput_rps": round(len(latencies) / duration, 1),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 2),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "max_ms": round(max(latencies) * 1000, 2),
+    }
+
+async def run_scenarios(targets: dict) -> dict:
+    rng = random.Random(args.seed)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", limits=limits, timeout=60) as client:
+        # The session cookie is 'secure', so it's sent manually over plain HTTP
+        response = await client.post("/admin/token", json={"username": ADMIN_USERNAME, "password": ADMIN_PASSWORD})
+        response.raise_for_status()
+        client.headers["Cookie"] = f"access_token={response.cookies['access_token']}"
+
+        results = {}
+        for scenario in args.scenarios:
+            requests = make_requests(scenario, targets, rng)
+            results[scenario] = await run_scenario(client, requests)
+            print_result(scenario, results[scenario])
+        return results
+
+
+# ---------------------------------------------------------------------------- #
+#                                    RESULTS                                   #
+# ---------------------------------------------------------------------------- #
+def print_result(scenario: str, result: dict):
+    if not result["requests"]:
+        print(f"{scenario:>14} no requests")
+        return
+    print(f"{scenario:>14} {result['requests']:>8} {result['errors']:>7} {result['throughput_rps']:>8.1f} "
+          f"{result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} {result['p99_ms']:>8.1f} {result['max_ms']:>8.1f}")
+
+def compare(results: dict, baseline_path: str) -> list[str]:
+    """
+    Print the change of p95 latency and throughput against an earlier run.
+
+    Returns:
+        list[str]: Scenarios whose p95 latency got worse by more than --max-regression percent.
+    """
+    baseline = json.loads(Path(baseline_path).read_text())
+    print(f"\ncompared to {baseline_path} (commit {baseline.get('commit')})")
+    print(f"{'scenario':>14} {'p95 ms':>17} {'change':>8} {'rps':>15} {'change':>8}")
+    regressions = []
+    for scenario, result in results.items():
+        before = baseline["results"].get(scenario)
+        if not before or not before.get("requests") or not result.get("requests"):
+            continue
+        p95_change = (result["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100 if before["p95_ms"] else 0.0
+        rps_change = (result["throughput_rps"] - before["throughput_rps"]) / before["throughput_rps"] * 100
+        print(f"{scenario:>14} {before['p95_ms']:>8.1f} → {result['p95_ms']:>6.1f} {p95_change:>+7.1f}% "
+              f"{before['throughput_rps']:>6.1f} → {result['throughput_rps']:>6.1f} {rps_change:>+7.1f}%")
+        if args.max_regression is not None and p95_change > args.max_regression:
+            regressions.append(scenario)
+    return regressions
+
+
+if __name__ == "__main__":
+    engine = create_engine(args.db_url)
+    if args.reuse_db:
+        seeded = None
+    else:
+        print(f"seeding {args.seminars} seminars, {args.participants} participants, {args.locations} locations ...")
+        seeded = seed_database(engine, args.seminars, args.participants, args.locations, args.seed)
+        print(f"seeded in {seeded['seconds']} s")
+    targets = load_targets(engine)
+
+    sink = SMTPSink().start()
+    server = start_server(sink.port)
+    try:
+        print(f"\n{'scenario':>14} {'requests':>8} {'errors':>7} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+        results = asyncio.run(run_scenarios(targets))
+
+        # Registrations queue two emails each, unregistering one, wait for the outbox to deliver them
+        expected = 2 * results.get("registration", {}).get("requests", 0) + results.get("unregister", {}).get("requests", 0)
+        start = time.perf_counter()
+        delivered = sink.wait_for(expected, timeout=120)
+        emails = {"expected": expected, "received": sink.messages, "bytes": sink.bytes,
+                  "delivery_seconds": round(time.perf_counter() - start, 2) if delivered else None}
+        print(f"\nemails: {sink.messages} of {expected} received" + ("" if delivered else " (timeout)"))
+    finally:
+        stop_server(server)
+        sink.stop()
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "database": engine.dialect.name,
+        "settings": {key: value for key, value in vars(args).items() if key not in ("compare", "output")},
+        "seeded": seeded,
+        "results": results,
+        "emails": emails,
+    }
+    output = Path(args.output)
+    output.mkdir(parents=True, exist_ok=True)
+    path = output / f"{datetime.now():%Y%m%d-%H%M%S}-{report['commit'] or 'unknown'}.json"
+    path.write_text(json.dumps(report, indent=2))
+    print(f"results saved to {path}")
+
+    if args.compare and compare(results, args.compare):
+        sys.exit(1)
@@ -0,0 +1,279 @@
+"""
+cache.py
+
+In-process response cache for the public read endpoints of the FastAPI application.
+
+The public data (seminars and locations) only changes when an admin edits something or
+someone registers, so the serialized JSON responses are cached per route and query parameters.
+Entries expire after a TTL, the least recently used entries are evicted when the cache
+exceeds its entry or byte limit, and the write functions in crud.py invalidate exactly the
+entries that depend on the changed rows (via tags) once their transaction is committed.
+
+Every uvicorn worker has its own cache and serves hits without touching the database.
+Writes invalidate the tags of the worker that committed them, the TTL bounds how long
+another worker may serve data that was changed through a different worker.
+
+Classes:
+- TTLCache: Thread-safe LRU cache with TTL, size limits, tag based invalidation (with generations) and hit/miss counters.
+
+Functions:
+- invalidate_on_commit: Invalidates tags after the given database session commits.
+- make_etag / etag_matches: Helpers for conditional GET requests.
+- cached_json_response: Serves a JSON response from the response cache, with ETag support.
+
+Exports:
+- response_cache: The cache used for the public endpoints.
+"""
+
+from collections import OrderedDict
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from typing import Any, Callable, Hashable, Iterable
+import hashlib
+import os
+import threading
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Configuration
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", 60))                           # seconds
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 2048))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", 16 * 1024 * 1024))
+# Browsers may store the responses but have to revalidate them (ETag) before every use
+CACHE_CONTROL = os.getenv("RESPONSE_CACHE_CONTROL", "public, no-cache")
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries expire after 'ttl' seconds.
+
+    Every entry has a size (e.g. the length of a serialized response) and a set of tags.
+    The cache never holds more than 'max_entries' entries or 'max_bytes' in total,
+    'invalidate' removes all entries with one of the given tags.
+
+    Every invalidation advances a generation counter and records it for its tags. A value
+    loaded after reading 'generation()' is only stored by 'set(..., generation=...)' if none
+    of its tags was invalidated in the meantime, so data loaded before a concurrent write
+    was committed can't be cached after the write's invalidation already ran.
+    """
+
+    def __init__(self, ttl: float, max_entries: int, max_bytes: int | None = None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()   # key -> (expires_at, value, size, tags)
+        self._tags = {}                 # tag -> set of keys
+        self._bytes = 0
+        self._generation = 0
+        self._invalidated = {}          # tag -> generation of its last invalidation
+        self._cleared = 0               # generation of the last 'clear'
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def generation(self) -> int:
+        """
+        The current generation, read before loading a value that is stored with 'set'.
+        """
+        with self._lock:
+            return self._generation
+
+    def set(self, key: Hashable, value: Any, tags: Iterable[str] = (), size: int = 0, ttl: float | None = None,
+            generation: int | None = None):
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        tags = frozenset(tags)
+        with self._lock:
+            # The value was loaded before an invalidation of one of its tags, it may be stale
+            if generation is not None and (self._cleared > generation
+                                           or any(self._invalidated.get(tag, 0) > generation for tag in tags)):
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (expires_at, value, size, tags)
+            self._bytes += size
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+
+            # Evict least recently used entries
+            while len(self._entries) > self.max_entries or (self.max_bytes is not None and self._bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def pop(self, key: Hashable):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def invalidate(self, *tags: str):
+        with self._lock:
+            self._generation += 1
+            for tag in tags:
+                self._invalidated[tag] = self._generation
+                for key in list(self._tags.get(tag, ())):
+                    self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._cleared = self._generation
+            self._entries.clear()
+            self._tags.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _remove(self, key: Hashable):
+        _, _, size, tags = self._entries.pop(key)
+        self._bytes -= size
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+response_cache = TTLCache(ttl=RESPONSE_CACHE_TTL, max_entries=RESPONSE_CACHE_MAX_ENTRIES, max_bytes=RESPONSE_CACHE_MAX_BYTES)
+
+
+# ---------------------------------------------------------------------------- #
+#                                 INVALIDATION                                 #
+# ---------------------------------------------------------------------------- #
+def invalidate_on_commit(db: Session, *tags: str):
+    """
+    Invalidate the given cache tags once the session's transaction is committed.
+    Invalidating only after the commit prevents a concurrent request from caching the old
+    data again between the invalidation and the commit. Requests that loaded the old data
+    before the commit and store it afterwards are rejected by the generation check of
+    'TTLCache.set' (see 'cached_json_response').
+
+    Args:
+        db (Session): SQLAlchemy database session with the pending changes.
+        *tags (str): Cache tags to invalidate, e.g. "seminars" or "seminar:1".
+    """
+    db.info.setdefault("cache_tags", set()).update(tags)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_tags(session: Session):
+    tags = session.info.pop("cache_tags", None)
+    if tags:
+        response_cache.invalidate(*tags)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_tags(session: Session):
+    session.info.pop("cache_tags", None)
+
+
+# ---------------------------------------------------------------------------- #
+#                                   RESPONSES                                  #
+# ---------------------------------------------------------------------------- #
+def make_etag(key: Hashable) -> str:
+    """
+    Create a strong ETag from a cache key.
+    """
+    return '"' + hashlib.sha1(repr(key).encode()).hexdigest() + '"'
+
+def _body_etag(body: bytes, headers: dict) -> str:
+    """
+    Create a strong ETag from a response body and its headers (e.g. 'X-Total-Count').
+    """
+    digest = hashlib.sha1(body)
+    digest.update(repr(sorted(headers.items())).encode())
+    return '"' + digest.hexdigest() + '"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    Check the 'If-None-Match' header of the request against an ETag.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+def cached_json_response(
+    request: Request,
+    loader: Callable[[], tuple],
+    tags: Iterable[str] | Callable[[Any], Iterable[str]],
+    validator: Callable[[], Hashable] | None = None,
+) -> Response:
+    """
+    Serve a JSON response from the response cache. The cache key is the request path
+    together with the query parameters.
+
+    Every response carries a strong ETag and a request with a matching 'If-None-Match'
+    header is answered with 304 Not Modified. On a cache hit neither needs the database.
+    By default the ETag is a hash of the response body and headers. With a validator (e.g.
+    the revision of a seminar, which changes in the same transaction as the seminar) it is
+    derived from the validator instead, so on a cache miss a matching request is answered
+    without loading or serializing anything, also by a worker that didn't serve the response
+    before. If the validator changes while the response is loaded, the body hash is used.
+
+    Args:
+        request (Request): The incoming request.
+        loader (Callable): Called on a cache miss, returns a tuple (content, headers).
+        tags (Iterable[str] | Callable): Cache tags of the response, or a function computing
+            them from the loaded content.
+        validator (Callable, optional): Called before and after loading on a cache miss,
+            returns a cheap value that changes whenever the response changes.
+
+    Returns:
+        Response: The JSON response, or an empty 304 response.
+    """
+    key = (request.url.path, tuple(sorted(request.query_params.multi_items())))
+    # Read before anything is loaded, see TTLCache
+    generation = response_cache.generation()
+
+    entry = response_cache.get(key)
+    if entry is None:
+        etag = None
+        if validator is not None:
+            version = validator()
+            etag = make_etag((key, version))
+            if etag_matches(request, etag):
+                return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+        content, headers = loader()
+        body = JSONResponse(content=jsonable_encoder(content)).body
+        # A write committed during the load may or may not be part of the body, so the
+        # validator's ETag only applies if the version didn't change in the meantime
+        if validator is not None and validator() != version:
+            etag = None
+        if etag is None:
+            etag = _body_etag(body, headers)
+        entry = (body, headers, etag)
+        response_cache.set(key, entry, tags=tags(content) if callable(tags) else tags, size=len(body), generation=generation)
+
+    body, headers, etag = entry
+    cache_headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=cache_headers)
+    return Response(content=body, media_type="application/json", headers={**headers, **cache_headers})
@@ -0,0 +1,197 @@
+"""
+certificate_utils.py
+
+Creates attendance certificates (Teilnahmebescheinigungen) for all participants of a seminar.
+
+The static part of a certificate (border, heading, signature line) is drawn once per document
+as a form (PDF XObject) and placed on every page, so each additional certificate only adds
+the participant specific text. The participants are split into chunks of CERTIFICATE_CHUNK_SIZE
+which are rendered in parallel in the render process pool (see render_pool.py) and then
+merged into one PDF or packed into a ZIP file with one PDF per participant.
+
+Functions:
+- render_certificates_pdf: Renders the certificates of some participants into one PDF.
+- render_certificate_files: Renders one PDF per participant.
+- generate_certificates_pdf: Renders all certificates of a seminar in parallel, merged into one PDF.
+- stream_certificates_zip: Renders all certificates of a seminar in parallel and yields a ZIP file.
+"""
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib.units import cm
+from reportlab.lib import colors
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfgen.canvas import Canvas
+from pypdf import PdfWriter
+from io import BytesIO
+from typing import Iterator, List, Tuple
+from schemas import ParticipantOut, SeminarOut
+from pdf_utils import ZipStream
+from render_pool import get_render_pool
+from tracing import span
+import os
+import re
+import zipfile
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Configuration
+CERTIFICATE_CHUNK_SIZE = int(os.getenv("CERTIFICATE_CHUNK_SIZE", 250))     # certificates per render task
+CERTIFICATE_ISSUER = os.getenv("CERTIFICATE_ISSUER", "")                  # printed below the signature line
+
+# Layout
+PAGE_SIZE = landscape(A4)
+PAGE_WIDTH, PAGE_HEIGHT = PAGE_SIZE
+TEXT_WIDTH = PAGE_WIDTH - 8 * cm
+TEMPLATE_NAME = "certificate"
+
+
+def _draw_template(canvas: Canvas):
+    """
+    Define the static layout shared by all certificates of a document as a form.
+    """
+    canvas.beginForm(TEMPLATE_NAME)
+
+    canvas.setStrokeColor(colors.darkgrey)
+    canvas.setLineWidth(3)
+    canvas.rect(1.5 * cm, 1.5 * cm, PAGE_WIDTH - 3 * cm, PAGE_HEIGHT - 3 * cm)
+    canvas.setLineWidth(0.8)
+    canvas.rect(1.8 * cm, 1.8 * cm, PAGE_WIDTH - 3.6 * cm, PAGE_HEIGHT - 3.6 * cm)
+
+    canvas.setFillColor(colors.black)
+    canvas.setFont("Helvetica-Bold", 34)
+    canvas.drawCentredString(PAGE_WIDTH / 2, PAGE_HEIGHT - 5 * cm, "Teilnahmebescheinigung")
+    canvas.setFont("Helvetica", 14)
+    canvas.drawCentredString(PAGE_WIDTH / 2, PAGE_HEIGHT - 7 * cm, "Hiermit wird bestätigt, dass")
+
+    # Place/date and signature line
+    canvas.setLineWidth(0.5)
+    canvas.line(4 * cm, 4 * cm, 11 * cm, 4 * cm)
+    canvas.line(PAGE_WIDTH - 11 * cm, 4 * cm, PAGE_WIDTH - 4 * cm, 4 * cm)
+    canvas.setFont("Helvetica", 10)
+    canvas.drawCentredString(7.5 * cm, 3.4 * cm, "Ort, Datum")
+    canvas.drawCentredString(PAGE_WIDTH - 7.5 * cm, 3.4 * cm, CERTIFICATE_ISSUER or "Unterschrift")
+
+    canvas.endForm()
+
+def _draw_certificate(canvas: Canvas, seminar: SeminarOut, participant: ParticipantOut):
+    """
+    Draw the participant specific text on top of the template and finish the page.
+    """
+    canvas.doForm(TEMPLATE_NAME)
+
+    canvas.setFont("Helvetica-Bold", 26)
+    canvas.drawCentredString(PAGE_WIDTH / 2, PAGE_HEIGHT - 9 * cm, f"{participant.firstname} {participant.lastname}")
+
+    canvas.setFont("Helvetica", 14)
+    canvas.drawCentredString(PAGE_WIDTH / 2, PAGE_HEIGHT - 10.8 * cm,
+                             f"am {seminar.date.strftime('%d.%m.%Y')} an dem Seminar")
+
+    y = PAGE_HEIGHT - 12.2 * cm
+    canvas.setFont("Helvetica-Bold", 18)
+    for line in simpleSplit(seminar.title, "Helvetica-Bold", 18, TEXT_WIDTH)[:3]:
+        canvas.drawCentredString(PAGE_WIDTH / 2, y, line)
+        y -= 0.8 * cm
+
+    canvas.setFont("Helvetica", 14)
+    place = f"in {seminar.location.city} " if seminar.location else ""
+    canvas.drawCentredString(PAGE_WIDTH / 2, y - 0.4 * cm, f"{place}teilgenommen hat.")
+
+    canvas.setFont("Helvetica", 12)
+    place_date = seminar.date.strftime("%d.%m.%Y")
+    if seminar.location:
+        place_date = f"{seminar.location.city}, {place_date}"
+    canvas.drawCentredString(7.5 * cm, 4.3 * cm, place_date)
+    canvas.showPage()
+
+def render_certificates_pdf(seminar: SeminarOut, participants: List[ParticipantOut]) -> bytes:
+    """
+    Render the certificates of the given participants into one PDF, one page per participant.
+
+    Args:
+        seminar (SeminarOut): The seminar with location info.
+        participants (List[ParticipantOut]): The participants.
+
+    Returns:
+        bytes: The PDF file.
+    """
+    buffer = BytesIO()
+    canvas = Canvas(buffer, pagesize=PAGE_SIZE)
+    canvas.setTitle(f"Teilnahmebescheinigungen {seminar.title}")
+    _draw_template(canvas)
+    for participant in participants:
+        _draw_certificate(canvas, seminar, participant)
+    canvas.save()
+    return buffer.getvalue()
+
+def _certificate_filename(participant: ParticipantOut) -> str:
+    name = re.sub(r"[^\w-]+", "_", f"{participant.lastname}_{participant.firstname}").strip("_")
+    return f"Teilnahmebescheinigung_{name}_{participant.participant_id}.pdf"
+
+def render_certificate_files(seminar: SeminarOut, participants: List[ParticipantOut]) -> List[Tuple[str, bytes]]:
+    """
+    Render one PDF per participant.
+
+    Args:
+        seminar (SeminarOut): The seminar with location info.
+        participants (List[ParticipantOut]): The participants.
+
+    Returns:
+        List[Tuple[str, bytes]]: Filename and PDF file of every participant.
+    """
+    return [(_certificate_filename(participant), render_certificates_pdf(seminar, [participant]))
+            for participant in participants]
+
+def _chunks(participants: List[ParticipantOut]) -> List[List[ParticipantOut]]:
+    return [participants[i:i + CERTIFICATE_CHUNK_SIZE] for i in range(0, len(participants), CERTIFICATE_CHUNK_SIZE)]
+
+def generate_certificates_pdf(seminar: SeminarOut, participants: List[ParticipantOut]) -> bytes:
+    """
+    Render the certificates of all participants in parallel and merge them into one PDF,
+    in the order of the participants.
+
+    Args:
+        seminar (SeminarOut): The seminar with location info.
+        participants (List[ParticipantOut]): The participants.
+
+    Returns:
+        bytes: The merged PDF file.
+    """
+    pool = get_render_pool()
+    with span("pdf.certificates", seminar_id=seminar.seminar_id, participants=len(participants)):
+        futures = [pool.submit(render_certificates_pdf, seminar, chunk) for chunk in _chunks(participants)]
+
+        writer = PdfWriter()
+        for future in futures:
+            writer.append(BytesIO(future.result()))
+        buffer = BytesIO()
+        with span("pdf.merge", chunks=len(futures)):
+            writer.write(buffer)
+        return buffer.getvalue()
+
+def stream_certificates_zip(seminar: SeminarOut, participants: List[ParticipantOut]) -> Iterator[bytes]:
+    """
+    Render the certificates of all participants in parallel and yield a ZIP file with one
+    PDF per participant. The chunks are added in order, while the later ones are still rendered.
+
+    Args:
+        seminar (SeminarOut): The seminar with location info.
+        participants (List[ParticipantOut]): The participants.
+
+    Yields:
+        bytes: The next part of the ZIP file.
+    """
+    pool = get_render_pool()
+    futures = [pool.submit(render_certificate_files, seminar, chunk) for chunk in _chunks(participants)]
+
+    stream = ZipStream()
+    try:
+        with zipfile.ZipFile(stream, "w", compression=zipfile.ZIP_STORED) as archive:
+            for future in futures:
+                for filename, pdf in future.result():
+                    archive.writestr(filename, pdf)
+                yield stream.drain()
+        yield stream.drain()
+    finally:
+        # The client may have disconnected, don't render the remaining chunks
+        for future in futures:
+            future.cancel()
@@ -0,0 +1,25 @@
+from sqlalchemy import text
+from database import engine, Base, SessionLocal
+from models import SEMINAR_SEARCH_DDL, TableVersion
+
+# Upgrade databases created by an older version, without touching existing data:
+# create the missing tables (e.g. 'email_outbox', 'table_versions'), existing ones are skipped
+Base.metadata.create_all(bind=engine)
+
+# version counters used for the ETags
+with SessionLocal() as db:
+    existing = {name for (name,) in db.query(TableVersion.table_name)}
+    db.add_all([TableVersion(table_name=name, version=0) for name in TableVersion.TABLES if name not in existing])
+    db.commit()
+
+# Add the indexes (and the full-text search column) to tables created before they existed
+for table in Base.metadata.sorted_tables:
+    for index in table.indexes:
+        index.create(bind=engine, checkfirst=True)
+
+if engine.dialect.name == "postgresql":
+    with engine.begin() as connection:
+        for statement in SEMINAR_SEARCH_DDL:
+            connection.execute(text(statement))
+
+print("successfully created the missing tables and indexes")
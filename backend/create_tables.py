@@ -1,8 +1,13 @@
-from database import engine, Base
+from database import engine, Base, SessionLocal
 import models  # important to import models to register them with Base, do not remove
 
 # deletes all tables
 Base.metadata.drop_all(bind=engine)
 
 Base.metadata.create_all(bind=engine)
+
+# version counters used for the ETags
+with SessionLocal() as db:
+    db.add_all([models.TableVersion(table_name=name, version=0) for name in models.TableVersion.TABLES])
+    db.commit()
 print("successfully created tables")
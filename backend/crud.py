@@ -9,14 +9,21 @@ Sections:
 - Seminar actions
 - Location actions
 - Participant actions
+- Table versions
 """
 
-from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy import select, tuple_, or_
+from sqlalchemy.orm import Session, joinedload
 from sqlalchemy.sql import func
 from fastapi import HTTPException
-from models import Seminar, Location, Participant
-from schemas import SeminarCreate, LocationCreate, ParticipantAdd, SeminarOut, LocationOut
-from email_functions import send_unregistered_email
+from models import Seminar, Location, Participant, TableVersion
+from schemas import SeminarCreate, LocationCreate, ParticipantAdd, SeminarOut, LocationOut, ParticipantOut
+from email_functions import build_unregistered_email
+from datetime import date
+from typing import List, Optional, Tuple
+from cache import invalidate_on_commit
+import outbox
+import base64
 import uuid
 
 
@@ -24,83 +31,173 @@ import uuid
 #                                SEMINAR ACTIONS                               #
 # ---------------------------------------------------------------------------- #
 
-def get_seminars(db: Session, limit: int = 10, offset: int = 0):
+def to_seminar_out(seminar: Seminar) -> SeminarOut:
     """
-    Returns a list of seminars.
+    Convert a seminar (with loaded location) to its Pydantic schema.
+    """
+    return SeminarOut(
+        seminar_id=seminar.seminar_id,
+        title=seminar.title,
+        description=seminar.description,
+        date=seminar.date,
+        time=seminar.time,
+        url=seminar.url,
+        max_participants=seminar.max_participants,
+        price=seminar.price,
+        image_name=seminar.image_name,
+        participants_count=seminar.participants_count,
+        location=to_location_out(seminar.location) if seminar.location else None
+    )
+
+def to_participant_out(participant: Participant) -> ParticipantOut:
+    """
+    Convert a participant to its Pydantic schema.
+    """
+    return ParticipantOut(
+        participant_id=participant.participant_id,
+        firstname=participant.firstname,
+        lastname=participant.lastname,
+        email=participant.email,
+        remarks=participant.remarks,
+        token=participant.token
+    )
+
+def encode_seminar_cursor(seminar: SeminarOut) -> str:
+    """
+    Create an opaque cursor pointing after the given seminar in the seminar listing.
+
+    Args:
+        seminar (SeminarOut): Last seminar of the current page.
+
+    Returns:
+        str: URL safe cursor encoding (date, seminar_id).
+    """
+    raw = f"{seminar.date.isoformat()}|{seminar.seminar_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_seminar_cursor(cursor: str) -> Tuple[date, int]:
+    """
+    Decode a cursor created by 'encode_seminar_cursor'.
+
+    Args:
+        cursor (str): The cursor.
+
+    Raises:
+        HTTPException 400: If the cursor is malformed.
+
+    Returns:
+        Tuple[date, int]: Date and ID of the last seminar of the previous page.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        seminar_date, seminar_id = raw.split("|")
+        return date.fromisoformat(seminar_date), int(seminar_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+def filter_seminars(
+    query,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    location_id: Optional[int] = None,
+    city: Optional[str] = None,
+    has_free_places: Optional[bool] = None,
+):
+    """
+    Restrict a seminar query. The date range is a range scan on the (date, seminar_id) index,
+    combined with a location on the (location_id, date, seminar_id) index.
+
+    Args:
+        query: SQLAlchemy query selecting from the seminars table.
+        date_from (date, optional): Only seminars on or after this date.
+        date_to (date, optional): Only seminars on or before this date.
+        location_id (int, optional): Only seminars at this location.
+        city (str, optional): Only seminars at locations in this city.
+        has_free_places (bool, optional): True for seminars with free places, False for fully booked ones.
+
+    Returns:
+        The filtered query.
+    """
+    if date_from is not None:
+        query = query.filter(Seminar.date >= date_from)
+    if date_to is not None:
+        query = query.filter(Seminar.date <= date_to)
+    if location_id is not None:
+        query = query.filter(Seminar.location_id == location_id)
+    if city:
+        query = query.filter(Seminar.location_id.in_(select(Location.location_id).where(Location.city == city)))
+    if has_free_places is not None:
+        free = or_(Seminar.max_participants.is_(None), Seminar.participants_count < Seminar.max_participants)
+        query = query.filter(free if has_free_places else ~free)
+    return query
+
+def get_seminars_page(db: Session, limit: int = 10, offset: int = 0, cursor: Optional[str] = None, **filters):
+    """
+    Returns a page of seminars ordered by date (descending) and the cursor of the next page.
+
+    With a cursor the seminars after the cursor position are returned (keyset pagination),
+    which uses the (date, seminar_id) index instead of scanning and discarding the skipped rows.
+    Without a cursor 'offset' is used.
 
     Args:
         db (Session): SQLAlchemy database session
         limit (int, optional): Maximum number of seminars to return. Defaults to 10.
-        offset (int, optional): Number of seminars to skip. Defaults to 0.
+        offset (int, optional): Number of seminars to skip, ignored if a cursor is given. Defaults to 0.
+        cursor (str, optional): Cursor returned with the previous page. Defaults to None.
+        **filters: Filters of 'filter_seminars' (date_from, date_to, location_id, city, has_free_places).
 
     Returns:
-        List[SeminarOut]: List of seminars, including LocationOut and number of participants registered.
+        Tuple[List[SeminarOut], str | None]: List of seminars and the cursor of the next page (None on the last page).
     """
-    
-    # Subquery to count participants
-    participant_count_subquery = (
-        db.query(
-            Participant.seminar_id,
-            func.count(Participant.participant_id).label("participants_count")
-        )
-        .group_by(Participant.seminar_id)
-        .subquery()
-    )
-    
-    # Fetch seminars with offset and limit, ordered by date (descending)
-    seminars = (
-        db.query(
-            Seminar,
-            func.coalesce(participant_count_subquery.c.participants_count, 0).label("participants_count")
-        )
-        .outerjoin(participant_count_subquery, Seminar.seminar_id == participant_count_subquery.c.seminar_id)
+    query = (
+        db.query(Seminar)
         .options(joinedload(Seminar.location))
-        .order_by(Seminar.date.desc())
-        .offset(offset)
-        .limit(limit)
-        .all()
+        .order_by(Seminar.date.desc(), Seminar.seminar_id.desc())
     )
+    query = filter_seminars(query, **filters)
+
+    if cursor:
+        query = query.filter(tuple_(Seminar.date, Seminar.seminar_id) < decode_seminar_cursor(cursor))
+    else:
+        query = query.offset(offset)
+
+    # Fetch one more row to know if there is a next page
+    seminars = query.limit(limit + 1).all()
 
     # Convert SQLAlchemy objects to Pydantic schemas
-    seminar_list = [
-        SeminarOut(
-            seminar_id=seminar.seminar_id,
-            title=seminar.title,
-            description=seminar.description,
-            date=seminar.date,
-            time=seminar.time,
-            url=seminar.url,
-            max_participants=seminar.max_participants,
-            price=seminar.price,
-            image_name=seminar.image_name,
-            participants_count=participants_count,
-            location=LocationOut(
-                location_id=seminar.location.location_id,
-                name=seminar.location.name,
-                street=seminar.location.street,
-                house_number=seminar.location.house_number,
-                zip_code=seminar.location.zip_code,
-                city=seminar.location.city,
-                remarks=seminar.location.remarks,
-                maps_url=seminar.location.maps_url,
-            ) if seminar.location else None
-        )
-        for seminar, participants_count in seminars
-    ]
+    seminar_list = [to_seminar_out(seminar) for seminar in seminars[:limit]]
+    next_cursor = encode_seminar_cursor(seminar_list[-1]) if len(seminars) > limit and seminar_list else None
 
-    return seminar_list
+    return seminar_list, next_cursor
+
+def get_seminars(db: Session, limit: int = 10, offset: int = 0, cursor: Optional[str] = None, **filters):
+    """
+    Returns a list of seminars.
+
+    Args:
+        db (Session): SQLAlchemy database session
+        limit (int, optional): Maximum number of seminars to return. Defaults to 10.
+        offset (int, optional): Number of seminars to skip. Defaults to 0.
+        cursor (str, optional): Return the seminars after this cursor instead of using the offset. Defaults to None.
+        **filters: Filters of 'filter_seminars'.
+
+    Returns:
+        List[SeminarOut]: List of seminars, including LocationOut and number of participants registered.
+    """
+    return get_seminars_page(db, limit, offset, cursor, **filters)[0]
 
-def count_seminars(db: Session):
+def count_seminars(db: Session, **filters):
     """
     Retrieve the number of seminars in the database.
 
     Args:
         db (Session): SQLAlchemy database session.
+        **filters: Filters of 'filter_seminars'.
 
     Returns:
         int: Seminar count.
     """
-    return db.query(Seminar).count()
+    return filter_seminars(db.query(func.count(Seminar.seminar_id)), **filters).scalar()
 
 def get_seminar_by_id(db: Session, seminar_id: int):
     """
@@ -116,55 +213,17 @@ def get_seminar_by_id(db: Session, seminar_id: int):
     Returns:
         SeminarOut: information about the seminar, including LocationOut and number of participants.
     """
-    
-    # Subquery to count participants
-    participant_count_subquery = (
-        db.query(
-            Participant.seminar_id,
-            func.count(Participant.participant_id).label("participants_count")
-        )
-        .group_by(Participant.seminar_id)
-        .subquery()
-    )
-
-    result = (
-        db.query(
-            Seminar,
-            func.coalesce(participant_count_subquery.c.participants_count, 0).label("participants_count")
-        )
-        .outerjoin(participant_count_subquery, Seminar.seminar_id == participant_count_subquery.c.seminar_id)
-        .options(selectinload(Seminar.location))
+    seminar = (
+        db.query(Seminar)
+        .options(joinedload(Seminar.location))
         .filter(Seminar.seminar_id == seminar_id)
         .first()
     )
 
-    if not result:
+    if not seminar:
         raise HTTPException(status_code=404, detail=f"Seminar with id={seminar_id} not found.")
 
-    seminar, participants_count = result
-
-    return SeminarOut(
-        seminar_id=seminar.seminar_id,
-        title=seminar.title,
-        description=seminar.description,
-        date=seminar.date,
-        time=seminar.time,
-        url=seminar.url,
-        max_participants=seminar.max_participants,
-        price=seminar.price,
-        image_name=seminar.image_name,
-        participants_count=participants_count,
-        location=LocationOut(
-            location_id=seminar.location.location_id,
-            name=seminar.location.name,
-            street=seminar.location.street,
-            house_number=seminar.location.house_number,
-            zip_code=seminar.location.zip_code,
-            city=seminar.location.city,
-            remarks=seminar.location.remarks,
-            maps_url=seminar.location.maps_url,
-        ) if seminar.location else None
-    )
+    return to_seminar_out(seminar)
     
 def create_seminar(db: Session, seminar: SeminarCreate):
     """
@@ -179,6 +238,8 @@ def create_seminar(db: Session, seminar: SeminarCreate):
     """
     seminar = Seminar(**seminar.dict())
     db.add(seminar)
+    invalidate_on_commit(db, "seminars")
+    bump_table_versions(db, "seminars")
     db.commit()
     db.refresh(seminar)
     return seminar
@@ -213,12 +274,35 @@ def update_seminar(db: Session, seminar_id: int, updated_seminar: SeminarOut):
     seminar.image_name = updated_seminar.image_name
     seminar.price = updated_seminar.price
     seminar.location_id = updated_seminar.location.location_id
+    seminar.revision = Seminar.revision + 1
 
+    invalidate_on_commit(db, "seminars", f"seminar:{seminar_id}")
+    bump_table_versions(db, "seminars")
     db.commit()
     db.refresh(seminar)
 
     return seminar
 
+def get_seminar_revision(db: Session, seminar_id: int) -> int:
+    """
+    Fetch the revision of a seminar, which changes with every edit of the seminar and
+    every participant added or removed.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        seminar_id (int): ID of the seminar.
+
+    Raises:
+        HTTPException 404: When an invalid ID is given.
+
+    Returns:
+        int: The revision of the seminar.
+    """
+    revision = db.query(Seminar.revision).filter(Seminar.seminar_id == seminar_id).scalar()
+    if revision is None:
+        raise HTTPException(status_code=404, detail=f"Seminar with id={seminar_id} not found.")
+    return revision
+
 def delete_seminar(db: Session, seminar_id: int):
     """
     Delete a single seminar in the database.
@@ -239,6 +323,8 @@ def delete_seminar(db: Session, seminar_id: int):
         raise HTTPException(status_code=404, detail=f"Seminar with id={seminar_id} does not exist, deletion failed.")
 
     db.delete(seminar)
+    invalidate_on_commit(db, "seminars", f"seminar:{seminar_id}")
+    bump_table_versions(db, "seminars")
     db.commit()
     return {"message": f"Seminar with id={seminar_id} and title={seminar.title} deleted successfully."}
 
@@ -246,6 +332,21 @@ def delete_seminar(db: Session, seminar_id: int):
 # ---------------------------------------------------------------------------- #
 #                               LOCATION ACTIONS                               #
 # ---------------------------------------------------------------------------- #
+def to_location_out(location: Location) -> LocationOut:
+    """
+    Convert a location to its Pydantic schema.
+    """
+    return LocationOut(
+        location_id=location.location_id,
+        name=location.name,
+        street=location.street,
+        house_number=location.house_number,
+        zip_code=location.zip_code,
+        city=location.city,
+        remarks=location.remarks,
+        maps_url=location.maps_url,
+    )
+
 def add_location(db: Session, location: LocationCreate):
     """
     Add a location to the database.
@@ -259,6 +360,8 @@ def add_location(db: Session, location: LocationCreate):
     """
     location = Location(**location.dict())
     db.add(location)
+    invalidate_on_commit(db, "locations")
+    bump_table_versions(db, "locations")
     db.commit()
     db.refresh(location)
     return location
@@ -326,6 +429,9 @@ def update_location(db: Session, location_id: int, updated_location: LocationOut
     location.remarks = updated_location.remarks
     location.maps_url = updated_location.maps_url
 
+    # Seminars embed their location
+    invalidate_on_commit(db, "locations", f"location:{location_id}", "seminars")
+    bump_table_versions(db, "locations")
     db.commit()
     db.refresh(location)
 
@@ -351,6 +457,8 @@ def delete_location(db: Session, location_id: int):
         raise HTTPException(status_code=404, detail=f"Location with id={location_id} not found.")
 
     db.delete(location)
+    invalidate_on_commit(db, "locations", f"location:{location_id}", "seminars")
+    bump_table_versions(db, "locations")
     db.commit()
 
     return {"message": f"Location with id={location_id} deleted successfully."}
@@ -359,17 +467,98 @@ def delete_location(db: Session, location_id: int):
 # ---------------------------------------------------------------------------- #
 #                              PARTICIPANT ACTIONS                             #
 # ---------------------------------------------------------------------------- #
-def add_participant(db: Session, participant: ParticipantAdd):
+def _change_participants_count(db: Session, seminar_id: int, delta: int):
+    """
+    Atomically change 'Seminar.participants_count' within the current transaction.
+    """
+    invalidate_on_commit(db, "seminars", f"seminar:{seminar_id}")
+    (
+        db.query(Seminar)
+        .filter(Seminar.seminar_id == seminar_id)
+        .update({
+            Seminar.participants_count: Seminar.participants_count + delta,
+            Seminar.revision: Seminar.revision + 1,
+        }, synchronize_session=False)
+    )
+
+def _reserve_seat(db: Session, seminar_id: int):
+    """
+    Atomically take one seat of a seminar within the current transaction.
+
+    The capacity check and the increment are a single conditional UPDATE, so concurrent
+    registrations can't oversell a seminar: the database locks the seminar row until the
+    transaction ends and re-evaluates the condition for every waiting registration.
+
+    Raises:
+        HTTPException 404: If the seminar does not exist.
+        HTTPException 409: If the seminar is fully booked.
+    """
+    reserved = (
+        db.query(Seminar)
+        .filter(
+            Seminar.seminar_id == seminar_id,
+            or_(Seminar.max_participants.is_(None), Seminar.participants_count < Seminar.max_participants),
+        )
+        .update({
+            Seminar.participants_count: Seminar.participants_count + 1,
+            Seminar.revision: Seminar.revision + 1,
+        }, synchronize_session=False)
+    )
+    if not reserved:
+        if not db.get(Seminar, seminar_id):
+            raise HTTPException(status_code=404, detail=f"Seminar with id={seminar_id} not found.")
+        raise HTTPException(status_code=409, detail="Seminar is fully booked.")
+
+    invalidate_on_commit(db, "seminars", f"seminar:{seminar_id}")
+
+def repair_participants_counts(db: Session) -> int:
+    """
+    Recalculate 'Seminar.participants_count' from the participants table for all
+    seminars whose counter is out of sync.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+
+    Returns:
+        int: Number of repaired seminars.
+    """
+    actual_count = (
+        select(func.count(Participant.participant_id))
+        .where(Participant.seminar_id == Seminar.seminar_id)
+        .scalar_subquery()
+    )
+    repaired = (
+        db.query(Seminar)
+        .filter(Seminar.participants_count != actual_count)
+        .update({
+            Seminar.participants_count: actual_count,
+            Seminar.revision: Seminar.revision + 1,
+        }, synchronize_session=False)
+    )
+    invalidate_on_commit(db, "seminars", "seminar-details")
+    db.commit()
+    return repaired
+
+def add_participant(db: Session, participant: ParticipantAdd, commit: bool = True):
     """
     Add a participant with the associated seminar_id to the database.
 
     Args:
         db (Session): SQLAlchemy database session.
         participant (ParticipantAdd): Participant to add.
+        commit (bool, optional): If False, the participant is only flushed so the caller can
+            add more changes (e.g. queued emails) to the same transaction. Defaults to True.
+
+    Raises:
+        HTTPException 404: If the seminar does not exist.
+        HTTPException 409: If the seminar is fully booked.
         
     Returns:
         ParticipantAdd: The added participant.
     """
+    # Take a seat first, the seminar row stays locked until the transaction ends
+    _reserve_seat(db, participant.seminar_id)
+
     token = str(uuid.uuid4())
     participant = Participant(
     firstname=participant.firstname,
@@ -380,8 +569,12 @@ def add_participant(db: Session, participant: ParticipantAdd):
     token=token
 )
     db.add(participant)
-    db.commit()
-    db.refresh(participant)
+
+    if commit:
+        db.commit()
+        db.refresh(participant)
+    else:
+        db.flush()
     return participant
 
 def get_participants(db: Session, seminar_id: int):
@@ -409,6 +602,39 @@ def get_participants(db: Session, seminar_id: int):
         .all()
     )
 
+def get_participant_lists(db: Session, date_from: date, date_to: date) -> List[Tuple[SeminarOut, int, List[ParticipantOut]]]:
+    """
+    Retrieve all seminars within a date range together with their revision and participants,
+    using one query for the seminars and one for the participants.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        date_from (date): First day of the range.
+        date_to (date): Last day of the range (inclusive).
+
+    Returns:
+        List[Tuple[SeminarOut, int, List[ParticipantOut]]]: Seminar, revision and participants, ordered by date.
+    """
+    seminars = (
+        db.query(Seminar)
+        .options(joinedload(Seminar.location))
+        .filter(Seminar.date >= date_from, Seminar.date <= date_to)
+        .order_by(Seminar.date, Seminar.time, Seminar.seminar_id)
+        .all()
+    )
+
+    participants = {seminar.seminar_id: [] for seminar in seminars}
+    if seminars:
+        rows = (
+            db.query(Participant)
+            .filter(Participant.seminar_id.in_(participants.keys()))
+            .order_by(Participant.firstname)
+        )
+        for participant in rows:
+            participants[participant.seminar_id].append(to_participant_out(participant))
+
+    return [(to_seminar_out(seminar), seminar.revision, participants[seminar.seminar_id]) for seminar in seminars]
+
 def unregister_participant(db: Session, token: str):
     """
     Unregister (delete) a participant using the participants token.
@@ -424,14 +650,60 @@ def unregister_participant(db: Session, token: str):
         str: Success message in German.
     """
     participant = db.query(Participant).filter_by(token=token).first()
-    seminar = get_seminar_by_id(db, participant.seminar_id)
     
     if not participant:
         raise HTTPException(status_code=404, detail="Ungültiger Link oder Teilnehmer bereits abgemeldet.")
     
-    send_unregistered_email(participant, seminar)
+    seminar = get_seminar_by_id(db, participant.seminar_id)
+    
+    # Info email to the admin is sent by the outbox worker once the deletion is committed
+    outbox.enqueue_email(db, build_unregistered_email(participant, seminar))
     
     db.delete(participant)
+    _change_participants_count(db, participant.seminar_id, -1)
     db.commit()
+    outbox.worker.wake()
     
-    return "Sie wurden erfolgreich vom Seminar abgemeldet."
\ No newline at end of file
+    return "Sie wurden erfolgreich vom Seminar abgemeldet."
+
+
+# ---------------------------------------------------------------------------- #
+#                                TABLE VERSIONS                                #
+# ---------------------------------------------------------------------------- #
+def bump_table_versions(db: Session, *table_names: str):
+    """
+    Increment the version of the given tables within the current transaction.
+    Only seminar and location writes are versioned (the ETags of the location endpoints
+    and the search index depend on them), participant changes bump 'Seminar.revision'
+    instead, so registrations for different seminars don't wait for each other.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        *table_names (str): Names of the changed tables, e.g. "seminars".
+    """
+    for table_name in table_names:
+        updated = (
+            db.query(TableVersion)
+            .filter(TableVersion.table_name == table_name)
+            .update({TableVersion.version: TableVersion.version + 1}, synchronize_session=False)
+        )
+        if not updated:
+            db.add(TableVersion(table_name=table_name, version=1))
+
+def get_table_versions(db: Session, *table_names: str) -> Tuple[int, ...]:
+    """
+    Retrieve the current versions of the given tables.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        *table_names (str): Names of the tables.
+
+    Returns:
+        Tuple[int, ...]: The versions in the order of 'table_names' (0 for unknown tables).
+    """
+    rows = dict(
+        db.query(TableVersion.table_name, TableVersion.version)
+        .filter(TableVersion.table_name.in_(table_names))
+        .all()
+    )
+    return tuple(rows.get(table_name, 0) for table_name in table_names)
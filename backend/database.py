@@ -5,15 +5,27 @@ Initializes the database connection and session for the FastAPI application
 using SQLAlchemy. This module is responsible for setting up the database
 infrastructure.
 
+The connection pools are configured with the DB_POOL_* environment variables and
+instrumented by pool_metrics.py, the statements are counted per request by metrics.py
+and the slow ones are logged by slow_query_log.py. Sampled requests get a span per statement (tracing.py).
+
 Exports:
 - engine: SQLAlchemy Engine instance used to interact with the database.
 - SessionLocal: Session factory used to create scoped database sessions.
+- async_engine: SQLAlchemy AsyncEngine for the same database, used by the async endpoints.
+- AsyncSessionLocal: Session factory for AsyncSession objects.
 - Base: Declarative base class for all ORM models.
 """
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import Pool, QueuePool, AsyncAdaptedQueuePool
+from pool_metrics import PoolMetrics, instrumented_pool_class, instrument_engine
+from metrics import instrument_sql
+from slow_query_log import instrument_slow_queries
+from tracing import instrument_tracing
 import os
 from dotenv import load_dotenv
 
@@ -21,6 +33,59 @@ load_dotenv()
 
 DATABASE_URL = os.getenv("DB_URL")
 
-engine = create_engine(DATABASE_URL)
+# Connection pool (per engine and uvicorn worker)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))       # seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))       # seconds until a connection is replaced
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+# Async drivers for the synchronous database URLs
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def get_async_database_url(database_url: str) -> str:
+    """
+    Derive the URL for the async engine from the synchronous database URL,
+    e.g. 'postgresql://...' becomes 'postgresql+asyncpg://...'.
+    """
+    url = make_url(database_url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.drivername, url.drivername)).render_as_string(hide_password=False)
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DB_URL") or get_async_database_url(DATABASE_URL)
+
+def get_pool_options(database_url: str, pool_class: type[Pool], metrics: PoolMetrics) -> dict:
+    """
+    Engine arguments for the configured connection pool. SQLite keeps its default pool,
+    it doesn't support the size options.
+    """
+    options = {"pool_pre_ping": DB_POOL_PRE_PING, "pool_recycle": DB_POOL_RECYCLE}
+    if make_url(database_url).get_backend_name() != "sqlite":
+        options.update(
+            poolclass=instrumented_pool_class(pool_class, metrics),
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+        )
+    return options
+
+sync_pool_metrics = PoolMetrics("sync")
+engine = create_engine(DATABASE_URL, **get_pool_options(DATABASE_URL, QueuePool, sync_pool_metrics))
+instrument_engine(engine, sync_pool_metrics)
+instrument_sql(engine)
+instrument_slow_queries(engine)
+instrument_tracing(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+async_pool_metrics = PoolMetrics("async")
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **get_pool_options(ASYNC_DATABASE_URL, AsyncAdaptedQueuePool, async_pool_metrics))
+instrument_engine(async_engine.sync_engine, async_pool_metrics)
+instrument_sql(async_engine.sync_engine)
+instrument_slow_queries(async_engine.sync_engine)
+instrument_tracing(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=async_engine)
+
 Base = declarative_base()
@@ -2,24 +2,36 @@
 email_functions.py
 
 Handles all email-related functionality for the FastAPI application.
+The 'build_*' functions only compose the messages, the endpoints put them into
+the outbox (see outbox.py) which delivers them in the background via 'send_email'.
+
+Connections:
+- SMTPConnectionPool: Keeps authenticated SMTP sessions open so a burst of emails costs one
+  TLS handshake and login instead of one per message. Broken sessions are re-established.
 
 Functions:
-- send_email: Low-level helper to send email via SMTP with SSL.
-- send_confirmation: Sends registration confirmation to the participant.
-- send_registration_info: Notifies admin with a list of current participants.
-- send_form: Sends the contact form content to the admin.
-- send_unregistering_info: Sends an info email to the admin when a participant unregisters from a seminar.
+- send_email: Low-level helper to send email via SMTP (with SSL unless SMTP_USE_SSL is false).
+- send_emails: Sends a batch of emails over one pooled SMTP session.
+- build_confirmation: Builds the registration confirmation for the participant.
+- build_registration_info: Builds the admin notification with a list of current participants.
+- build_form: Builds the email with the contact form content for the admin.
+- build_unregistered_email: Builds the admin info email when a participant unregisters from a seminar.
 """
 
 from datetime import datetime
 from dotenv import load_dotenv
 from email.message import EmailMessage
-from smtplib import SMTP_SSL
+from smtplib import SMTP, SMTP_SSL, SMTPServerDisconnected, SMTPRecipientsRefused, SMTPSenderRefused, SMTPDataError
+from contextlib import contextmanager
 from fastapi import HTTPException
 from typing import List
 import os
+import queue
 import ssl
+import threading
+import time
 from schemas import SeminarOut, ParticipantAdd, ContactForm, SeminarCreate
+from tracing import span
 
 load_dotenv()
 
@@ -28,10 +40,141 @@ SMTP_SERVER = os.getenv("SMTP_SERVER")
 SMTP_PORT = int(os.getenv("SMTP_PORT"))
 EMAIL_USERNAME = os.getenv("EMAIL_USERNAME")
 EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD")
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", 2))
+SMTP_IDLE_TIMEOUT = float(os.getenv("SMTP_IDLE_TIMEOUT", 60))  # seconds until an idle session is replaced
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", 30))
+SMTP_USE_SSL = os.getenv("SMTP_USE_SSL", "true").lower() in ("1", "true", "yes")   # false for a local test server
+
+# Errors that only affect a single message, the SMTP session can still be used afterwards
+MESSAGE_ERRORS = (SMTPRecipientsRefused, SMTPSenderRefused, SMTPDataError)
+
+
+class SMTPConnectionPool:
+    """
+    Pool of logged in SMTP_SSL sessions.
+
+    At most 'size' sessions are open at the same time. Returned sessions are kept for
+    reuse, they are checked with NOOP before being handed out again and replaced when
+    they were idle for longer than 'idle_timeout' seconds or the server closed them.
+    """
+
+    def __init__(self, size: int = SMTP_POOL_SIZE, idle_timeout: float = SMTP_IDLE_TIMEOUT):
+        self._context = ssl.create_default_context()
+        self._idle_timeout = idle_timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _connect(self) -> SMTP_SSL:
+        with span("smtp.connect", ssl=SMTP_USE_SSL):
+            if SMTP_USE_SSL:
+                server = SMTP_SSL(SMTP_SERVER, SMTP_PORT, context=self._context, timeout=SMTP_TIMEOUT)
+            else:
+                server = SMTP(SMTP_SERVER, SMTP_PORT, timeout=SMTP_TIMEOUT)
+            try:
+                server.login(EMAIL_USERNAME, EMAIL_PASSWORD)
+            except Exception:
+                self._close(server)
+                raise
+            return server
+
+    @staticmethod
+    def _close(server: SMTP_SSL):
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    def _checkout(self) -> SMTP_SSL:
+        while True:
+            try:
+                server, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+
+            if time.monotonic() - last_used > self._idle_timeout:
+                self._close(server)
+                continue
+            try:
+                if server.noop()[0] == 250:
+                    return server
+            except Exception:
+                pass
+            server.close()
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a logged in session. The session is returned to the pool afterwards,
+        unless an exception escaped, in that case it is closed.
+        """
+        self._slots.acquire()
+        try:
+            server = self._checkout()
+            try:
+                yield server
+            except Exception:
+                server.close()
+                raise
+            self._idle.put((server, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """
+        Close all idle sessions, e.g. on shutdown.
+        """
+        while True:
+            try:
+                server, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close(server)
+
+
+smtp_pool = SMTPConnectionPool()
+
+
+def send_emails(messages: List[EmailMessage]) -> List[Exception | None]:
+    """
+    Send several emails over one pooled SMTP session. If the session breaks
+    (e.g. the server closed it), a new one is established once and the remaining
+    emails are sent over it.
+
+    Args:
+        messages (List[EmailMessage]): Messages with content and headers.
+
+    Returns:
+        List[Exception | None]: For every message None if it was sent, else the error.
+    """
+    errors = [None] * len(messages)
+    index = 0
+    reconnected = False
+
+    while index < len(messages):
+        try:
+            with smtp_pool.connection() as server:
+                while index < len(messages):
+                    try:
+                        with span("smtp.send"):
+                            server.send_message(messages[index])
+                    except MESSAGE_ERRORS as e:
+                        errors[index] = e
+                    index += 1
+        except (SMTPServerDisconnected, OSError) as e:
+            if reconnected:
+                errors[index:] = [e] * (len(messages) - index)
+                break
+            reconnected = True
+        except Exception as e:
+            errors[index:] = [e] * (len(messages) - index)
+            break
+
+    return errors
+
 
 def send_email(message: EmailMessage) -> dict:
     """
-    Send an email via SSL.
+    Send an email via SSL using a pooled SMTP session.
 
     Args:
         message (EmailMessage): A message with content and headers.
@@ -42,23 +185,18 @@ def send_email(message: EmailMessage) -> dict:
     Returns:
         dict: Sucess message.
     """
-    try:
-        context = ssl.create_default_context()
-        with SMTP_SSL(SMTP_SERVER, SMTP_PORT, context=context) as server:
-            server.login(EMAIL_USERNAME, EMAIL_PASSWORD)
-            server.send_message(message)
-        return {"message": "success"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Email konnte nicht gesendet werden, Exception: {e}")
+    error = send_emails([message])[0]
+    if error:
+        raise HTTPException(status_code=500, detail=f"Email konnte nicht gesendet werden, Exception: {error}")
+    return {"message": "success"}
 
 
-def send_confirmation(data: ParticipantAdd, seminar: SeminarOut, unregister_url: str) -> dict:
+def build_confirmation(data: ParticipantAdd, seminar: SeminarOut, unregister_url: str) -> EmailMessage:
     """
-    Send a confirmation email to a participant when he/she successfully registers for a seminar.
-    Calls 'send_email'.
+    Build the confirmation email to a participant when he/she successfully registers for a seminar.
 
     Returns:
-        dict: Sucess message.
+        EmailMessage: The confirmation email.
     """
     confirmation_msg = EmailMessage()
     confirmation_msg["From"] = EMAIL_USERNAME
@@ -79,16 +217,16 @@ Sie können sich unter folgendem Link vom Seminar abmelden. Bitte beachten Sie,
 {unregister_url}
     """
     )
-    return send_email(confirmation_msg)
+    return confirmation_msg
 
 
-def send_registration_info(data: ParticipantAdd, seminar: SeminarOut, participants: List[ParticipantAdd]) -> dict:
+def build_registration_info(data: ParticipantAdd, seminar: SeminarOut, participants: List[ParticipantAdd]) -> EmailMessage:
     """
-    Send an info email to the admin when a new participant registers. The email also contains a list
+    Build the info email to the admin when a new participant registers. The email also contains a list
     of all other participant registered for the specific seminar at that point in time.
     
     Returns:
-        dict: Sucess message.
+        EmailMessage: The info email.
     """
     info_msg = EmailMessage()
     info_msg["From"] = EMAIL_USERNAME
@@ -110,15 +248,15 @@ def send_registration_info(data: ParticipantAdd, seminar: SeminarOut, participan
     {participant_list}
         """
 )
-    return send_email(info_msg)
+    return info_msg
 
 
-def send_form(form: ContactForm) -> dict:
+def build_form(form: ContactForm) -> EmailMessage:
     """
-    Sends the contact form data as an email to the admin.
+    Builds an email to the admin containing the contact form data.
         
     Returns:
-        dict: Sucess message.
+        EmailMessage: The contact form email.
     """
     
     message = EmailMessage()
@@ -138,16 +276,16 @@ Nachricht:
 {form.message}
     """
     )
-    return send_email(message)
+    return message
 
 
-def send_unregistered_email(participant: ParticipantAdd, seminar: SeminarOut) -> dict:
+def build_unregistered_email(participant: ParticipantAdd, seminar: SeminarOut) -> EmailMessage:
     """
-    Sends an info email to the admin when a participant unregisters
+    Builds the info email to the admin when a participant unregisters
     from a seminar.
 
     Returns:
-        dict: Sucess message.
+        EmailMessage: The info email.
     """
     
     message = EmailMessage()
@@ -161,4 +299,4 @@ def send_unregistered_email(participant: ParticipantAdd, seminar: SeminarOut) ->
 abgemeldet.
 """ 
     )
-    return send_email(message)
\ No newline at end of file
+    return message
\ No newline at end of file
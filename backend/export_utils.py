@@ -0,0 +1,221 @@
+"""
+export_utils.py
+
+Streaming export of participant lists as CSV or XLSX file.
+
+The rows are read with a server-side cursor in batches of EXPORT_BATCH_SIZE and written to
+the response while they are read, so the memory usage of an export doesn't grow with the
+number of participants. The generators open their own database session, because a
+StreamingResponse is only iterated after the endpoint (and its dependencies) returned.
+
+The XLSX file is written without a spreadsheet library: a workbook with one sheet whose XML
+is compressed into the ZIP archive row by row, with inline strings instead of a shared
+strings table (which would keep every distinct name and email address in memory).
+
+Functions:
+- iter_participant_rows: Yields the participant rows of one or more seminars.
+- stream_participants_csv: Yields a CSV file in chunks.
+- stream_participants_xlsx: Yields an XLSX file in chunks.
+"""
+
+from sqlalchemy import select
+from database import SessionLocal
+from models import Seminar, Participant
+from datetime import date
+from typing import Iterator, Optional, Sequence
+from xml.sax.saxutils import escape
+import csv
+import io
+import os
+import re
+import zipfile
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Configuration
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 500))        # rows fetched per round trip
+EXPORT_CHUNK_SIZE = 64 * 1024                                       # bytes per response chunk
+
+HEADER = ["Seminar-ID", "Seminar", "Datum", "Vorname", "Nachname", "E-Mail", "Anmerkungen"]
+
+# ----- XLSX parts ----- #
+XLSX_PARTS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Teilnehmer" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+        '</Relationships>'
+    ),
+    # Style 1 is the date format of the date column
+    "xl/styles.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<numFmts count="1"><numFmt numFmtId="164" formatCode="DD.MM.YYYY"/></numFmts>'
+        '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+        '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+        '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+        '</styleSheet>'
+    ),
+}
+SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+SHEET_END = "</sheetData></worksheet>"
+COLUMNS = "ABCDEFG"
+EXCEL_EPOCH = date(1899, 12, 30)
+# Control characters aren't allowed in XML
+ILLEGAL_XML_CHARS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def iter_participant_rows(seminar_ids: Optional[Sequence[int]] = None) -> Iterator[tuple]:
+    """
+    Yield the participants of the given seminars, ordered by seminar and name.
+
+    Args:
+        seminar_ids (Sequence[int], optional): IDs of the seminars, all seminars if None.
+
+    Yields:
+        tuple: Seminar id, seminar title, seminar date, firstname, lastname, email and remarks.
+    """
+    query = (
+        select(
+            Seminar.seminar_id, Seminar.title, Seminar.date,
+            Participant.firstname, Participant.lastname, Participant.email, Participant.remarks,
+        )
+        .join(Participant, Participant.seminar_id == Seminar.seminar_id)
+        .order_by(Seminar.date, Seminar.seminar_id, Participant.lastname, Participant.firstname)
+        .execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE)
+    )
+    if seminar_ids is not None:
+        query = query.where(Seminar.seminar_id.in_(seminar_ids))
+
+    with SessionLocal() as db:
+        for row in db.execute(query):
+            yield tuple(row)
+
+def _sanitize(value):
+    """
+    Prevent spreadsheet programs from evaluating user input (e.g. remarks) as formula.
+    """
+    if isinstance(value, str) and value[:1] in ("=", "+", "-", "@", "\t", "\r"):
+        return "'" + value
+    return value
+
+def _xlsx_cell(reference: str, value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, date):
+        return f'<c r="{reference}" s="1"><v>{(value - EXCEL_EPOCH).days}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c r="{reference}"><v>{value}</v></c>'
+    text = escape(ILLEGAL_XML_CHARS.sub("", _sanitize(str(value))))
+    return f'<c r="{reference}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+def _xlsx_row(number: int, values) -> str:
+    cells = "".join(_xlsx_cell(f"{column}{number}", value) for column, value in zip(COLUMNS, values))
+    return f'<row r="{number}">{cells}</row>'
+
+
+class _ChunkBuffer(io.RawIOBase):
+    """
+    Write-only, unseekable file collecting the bytes written by zipfile until they are taken.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self.size = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        self.size = 0
+        return data
+
+def stream_participants_csv(seminar_ids: Optional[Sequence[int]] = None) -> Iterator[bytes]:
+    """
+    Yield a CSV file (UTF-8 with BOM, so Excel detects the umlauts) with the participants
+    of the given seminars in chunks of about EXPORT_CHUNK_SIZE bytes.
+
+    Args:
+        seminar_ids (Sequence[int], optional): IDs of the seminars, all seminars if None.
+
+    Yields:
+        bytes: The next part of the file.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write("\ufeff")
+    writer.writerow(HEADER)
+
+    for row in iter_participant_rows(seminar_ids):
+        writer.writerow([_sanitize(value) for value in row])
+        if buffer.tell() >= EXPORT_CHUNK_SIZE:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue().encode("utf-8")
+
+def stream_participants_xlsx(seminar_ids: Optional[Sequence[int]] = None) -> Iterator[bytes]:
+    """
+    Yield an XLSX file with the participants of the given seminars in chunks of about
+    EXPORT_CHUNK_SIZE bytes, compressed while the rows are read.
+
+    Args:
+        seminar_ids (Sequence[int], optional): IDs of the seminars, all seminars if None.
+
+    Yields:
+        bytes: The next part of the file.
+    """
+    buffer = _ChunkBuffer()
+    # An unseekable file makes zipfile write the sizes after each entry (data descriptors)
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in XLSX_PARTS.items():
+            archive.writestr(name, content)
+
+        with archive.open("xl/worksheets/sheet1.xml", "w") as sheet:
+            sheet.write((SHEET_START + _xlsx_row(1, HEADER)).encode("utf-8"))
+            for number, row in enumerate(iter_participant_rows(seminar_ids), start=2):
+                sheet.write(_xlsx_row(number, row).encode("utf-8"))
+                if buffer.size >= EXPORT_CHUNK_SIZE:
+                    yield buffer.take()
+            sheet.write(SHEET_END.encode("utf-8"))
+
+    yield buffer.take()
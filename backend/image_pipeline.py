@@ -0,0 +1,269 @@
+"""
+image_pipeline.py
+
+Responsive image derivatives for the seminar images and the images of the frontend build.
+
+Every source image is resized to several widths (IMAGE_WIDTHS) and saved as AVIF (if Pillow
+supports it), WebP and JPEG, so browsers can pick the smallest file fitting the screen
+(srcset) or get it from the '/images/{name}' endpoint. The derivatives are generated in the
+render process pool (see render_pool.py) and stored in IMAGE_CACHE_DIR under the content hash
+of the source, so they are only generated once per image content and never served stale.
+
+Sources are the uploaded seminar images in IMAGE_SOURCE_DIR (named like 'Seminar.image_name')
+and the JPG/PNG files in frontend/dist/assets.
+
+Functions:
+- generate_derivatives: Resizes one image (runs in a render process).
+- get_manifest: Returns the derivatives of an image, generating them in the background if missing.
+- pick_variant: Selects the derivative for a requested width and the formats a browser accepts.
+- save_upload: Validates and stores an uploaded image and starts the generation.
+- warm_up: Starts the generation for all images without derivatives.
+"""
+
+from concurrent.futures import Future
+from PIL import Image, ImageOps, features
+from pathlib import Path
+from render_pool import get_render_pool
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+BASE_DIR = Path(__file__).resolve().parent
+IMAGE_SOURCE_DIR = Path(os.getenv("IMAGE_SOURCE_DIR", BASE_DIR / "images"))
+IMAGE_CACHE_DIR = Path(os.getenv("IMAGE_CACHE_DIR", BASE_DIR / "images" / "derivatives"))
+ASSET_DIR = BASE_DIR.parent / "frontend" / "dist" / "assets"
+IMAGE_WIDTHS = [int(width) for width in os.getenv("IMAGE_WIDTHS", "320,640,960,1280,1920").split(",")]
+IMAGE_MAX_UPLOAD_BYTES = int(os.getenv("IMAGE_MAX_UPLOAD_BYTES", 10 * 1024 * 1024))
+IMAGE_MAX_PIXELS = 50_000_000       # refuse decompression bombs
+IMAGE_WARMUP = os.getenv("IMAGE_WARMUP", "true").lower() in ("1", "true", "yes")   # generate missing derivatives at startup
+
+# Output formats, best compression first: (format, file extension, MIME type, save options)
+FORMATS = [
+    ("AVIF", "avif", "image/avif", {"quality": 55}),
+    ("WEBP", "webp", "image/webp", {"quality": 80, "method": 6}),
+    ("JPEG", "jpg", "image/jpeg", {"quality": 82, "optimize": True, "progressive": True}),
+]
+FORMATS = [entry for entry in FORMATS if entry[0] == "JPEG" or features.check(entry[0].lower())]
+SOURCE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+NAME_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,63}$")
+
+_pending = {}               # content hash -> Future of the running generation
+_failed = set()             # content hashes of images that couldn't be processed
+_pending_lock = threading.Lock()
+
+
+# ---------------------------------------------------------------------------- #
+#                                  GENERATION                                  #
+# ---------------------------------------------------------------------------- #
+def generate_derivatives(source: str, target: str) -> dict:
+    """
+    Resize an image to all IMAGE_WIDTHS smaller than the original (plus the original width)
+    and save each width in all FORMATS. Runs in a render process.
+
+    Args:
+        source (str): Path of the source image.
+        target (str): Directory for the derivatives, named after the content hash of the source.
+
+    Returns:
+        dict: The manifest, also saved as 'manifest.json' in the target directory.
+    """
+    Image.MAX_IMAGE_PIXELS = IMAGE_MAX_PIXELS
+    target = Path(target)
+    target.mkdir(parents=True, exist_ok=True)
+
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+        image = image.convert("RGBA" if has_alpha else "RGB")
+        widths = sorted({width for width in IMAGE_WIDTHS if width < image.width} | {min(image.width, max(IMAGE_WIDTHS))})
+
+        variants = []
+        for width in widths:
+            height = round(image.height * width / image.width)
+            resized = image.resize((width, height), Image.Resampling.LANCZOS)
+            for image_format, extension, media_type, options in FORMATS:
+                # JPEG has no alpha channel
+                output = resized.convert("RGB") if image_format == "JPEG" and has_alpha else resized
+                path = target / f"{width}.{extension}"
+                output.save(path, image_format, **options)
+                variants.append({"width": width, "height": height, "format": extension,
+                                 "type": media_type, "bytes": path.stat().st_size})
+
+    manifest = {"hash": target.name, "width": image.width, "height": image.height, "variants": variants}
+    # Written last (and atomically), so an existing manifest means all derivatives are complete
+    temporary = target / f"manifest.{os.getpid()}.tmp"
+    temporary.write_text(json.dumps(manifest))
+    os.replace(temporary, target / "manifest.json")
+    return manifest
+
+
+# ---------------------------------------------------------------------------- #
+#                                    LOOKUP                                    #
+# ---------------------------------------------------------------------------- #
+def find_source(name: str) -> Path | None:
+    """
+    Find the source image of a name, an uploaded image or an image of the frontend build.
+    """
+    if not NAME_PATTERN.match(name):
+        return None
+    for directory in (IMAGE_SOURCE_DIR, ASSET_DIR):
+        for extension in SOURCE_EXTENSIONS:
+            path = directory / f"{name}{extension}"
+            if path.is_file():
+                return path
+    return None
+
+_hashes = {}                # source path -> (mtime, content hash)
+
+def content_hash(path: Path) -> str:
+    mtime = path.stat().st_mtime_ns
+    cached = _hashes.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, hashlib.sha256(path.read_bytes()).hexdigest()[:20])
+        _hashes[path] = cached
+    return cached[1]
+
+def _schedule(source: Path, digest: str) -> Future:
+    with _pending_lock:
+        future = _pending.get(digest)
+        if future is None:
+            future = get_render_pool().submit(generate_derivatives, str(source), str(IMAGE_CACHE_DIR / digest))
+            future.add_done_callback(lambda done: _generation_done(digest, source, done))
+            _pending[digest] = future
+        return future
+
+def _generation_done(digest: str, source: Path, future: Future):
+    with _pending_lock:
+        _pending.pop(digest, None)
+        if not future.cancelled() and future.exception() is not None:
+            _failed.add(digest)
+    if digest in _failed:
+        logger.error("Generating the derivatives of %s failed: %s", source, future.exception())
+
+def get_manifest(name: str) -> dict | None:
+    """
+    Return the manifest of an image. If the derivatives don't exist yet, their generation is
+    started in the background and the manifest has the status "pending".
+
+    Args:
+        name (str): Name of the image (e.g. 'Seminar.image_name').
+
+    Returns:
+        dict | None: The manifest with the derivatives, None if the image doesn't exist.
+    """
+    source = find_source(name)
+    if source is None:
+        return None
+
+    digest = content_hash(source)
+    manifest_path = IMAGE_CACHE_DIR / digest / "manifest.json"
+    if digest in _failed:
+        return {"name": name, "hash": digest, "status": "failed", "variants": []}
+    if not manifest_path.is_file():
+        _schedule(source, digest)
+        return {"name": name, "hash": digest, "status": "pending", "variants": []}
+
+    manifest = json.loads(manifest_path.read_text())
+    for variant in manifest["variants"]:
+        variant["url"] = f"/images/derivatives/{digest}/{variant['width']}.{variant['format']}"
+    return {"name": name, "status": "ready", **manifest}
+
+def pick_variant(manifest: dict, width: int | None, accept: str) -> dict | None:
+    """
+    Select the smallest derivative at least 'width' pixels wide (the largest one if none is),
+    in the best format the browser accepts according to its Accept header.
+
+    Args:
+        manifest (dict): Manifest of a ready image (see get_manifest).
+        width (int | None): Requested width in CSS pixels times device pixel ratio, largest if None.
+        accept (str): The Accept header of the request.
+
+    Returns:
+        dict | None: The selected variant, None if there are no derivatives.
+    """
+    formats = [extension for _, extension, media_type, _ in FORMATS if media_type in accept or extension == "jpg"]
+    variants = [variant for variant in manifest["variants"] if variant["format"] == formats[0]]
+    if not variants:
+        return None
+    fitting = [variant for variant in variants if width is not None and variant["width"] >= width]
+    return min(fitting, key=lambda variant: variant["width"]) if fitting else max(variants, key=lambda variant: variant["width"])
+
+def derivative_path(digest: str, filename: str) -> Path | None:
+    """
+    Path of a generated derivative, None for invalid or missing files.
+    """
+    if not re.fullmatch(r"[0-9a-f]{20}", digest) or not re.fullmatch(r"\d{1,5}\.(avif|webp|jpg)", filename):
+        return None
+    path = IMAGE_CACHE_DIR / digest / filename
+    return path if path.is_file() else None
+
+
+# ---------------------------------------------------------------------------- #
+#                                    UPLOAD                                    #
+# ---------------------------------------------------------------------------- #
+def save_upload(name: str, data: bytes) -> dict:
+    """
+    Validate an uploaded image, store it as source image and start generating its derivatives.
+
+    Args:
+        name (str): Name of the image, used as 'Seminar.image_name'.
+        data (bytes): Content of the uploaded file.
+
+    Raises:
+        ValueError: If the name is invalid, the file is too large or not a supported image.
+
+    Returns:
+        dict: The (pending) manifest of the image.
+    """
+    if not NAME_PATTERN.match(name):
+        raise ValueError("Invalid image name, use letters, digits, '-' and '_' only.")
+    if len(data) > IMAGE_MAX_UPLOAD_BYTES:
+        raise ValueError(f"Image is larger than {IMAGE_MAX_UPLOAD_BYTES // (1024 * 1024)} MB.")
+
+    Image.MAX_IMAGE_PIXELS = IMAGE_MAX_PIXELS
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image_format = image.format
+            image.verify()
+    except Exception:
+        raise ValueError("File is not a valid image.")
+    extension = {"JPEG": ".jpg", "PNG": ".png", "WEBP": ".webp"}.get(image_format)
+    if extension is None:
+        raise ValueError("Only JPEG, PNG and WebP images are supported.")
+
+    # Replace an existing image of the same name
+    IMAGE_SOURCE_DIR.mkdir(parents=True, exist_ok=True)
+    for existing in SOURCE_EXTENSIONS:
+        (IMAGE_SOURCE_DIR / f"{name}{existing}").unlink(missing_ok=True)
+    (IMAGE_SOURCE_DIR / f"{name}{extension}").write_bytes(data)
+
+    return get_manifest(name)
+
+def warm_up() -> int:
+    """
+    Start generating the derivatives of all source images that don't have them yet.
+
+    Returns:
+        int: Number of scheduled images.
+    """
+    scheduled = 0
+    for directory in (IMAGE_SOURCE_DIR, ASSET_DIR):
+        if not directory.is_dir():
+            continue
+        for path in directory.iterdir():
+            if path.suffix.lower() in SOURCE_EXTENSIONS and NAME_PATTERN.match(path.stem):
+                digest = content_hash(path)
+                if not (IMAGE_CACHE_DIR / digest / "manifest.json").is_file():
+                    _schedule(path, digest)
+                    scheduled += 1
+    return scheduled
@@ -0,0 +1,142 @@
+"""
+loop_monitor.py
+
+Detects blocking code on the asyncio event loop of the FastAPI application.
+
+Endpoints declared with 'async def' run directly on the event loop, so any blocking call
+inside them (bcrypt, SMTP, synchronous database access, ...) stalls every other request
+handled by the same uvicorn worker.
+
+Classes:
+- LoopLagMonitor: Heartbeat task measuring how late the event loop wakes up. Stalls above a
+  threshold are counted, logged together with the async routes in flight and exposed as stats.
+- LoopMonitorMiddleware: ASGI middleware registering the requests in flight with the monitor.
+
+Exports:
+- loop_monitor: The monitor started by the application lifespan.
+"""
+
+from collections import Counter
+from contextlib import contextmanager
+import asyncio
+import inspect
+import logging
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", 0.5))      # seconds between heartbeats
+LOOP_LAG_THRESHOLD = float(os.getenv("LOOP_LAG_THRESHOLD", 0.1))    # seconds of lag counted as a stall
+
+
+class LoopLagMonitor:
+    """
+    Sleeps for 'interval' seconds in a loop and measures how much later than expected
+    it wakes up. The difference is the time the loop was busy with other work,
+    e.g. a blocking call inside an async endpoint.
+    """
+
+    def __init__(self, interval: float = LOOP_LAG_INTERVAL, threshold: float = LOOP_LAG_THRESHOLD):
+        self.interval = interval
+        self.threshold = threshold
+        self._task = None
+        self._in_flight = {}        # id -> ASGI scope of the running request
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.total_lag = 0.0
+        self.heartbeats = 0
+        self.stalls = 0
+        self.route_stalls = Counter()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self._record(max(0.0, loop.time() - expected))
+
+    def _record(self, lag: float):
+        self.heartbeats += 1
+        self.last_lag = lag
+        self.total_lag += lag
+        self.max_lag = max(self.max_lag, lag)
+
+        if lag < self.threshold:
+            return
+
+        self.stalls += 1
+        routes = self._async_routes_in_flight()
+        self.route_stalls.update(routes)
+        logger.warning("Event loop blocked for %.0f ms, async requests in flight: %s",
+                       lag * 1000, ", ".join(routes) or "none")
+
+    def _async_routes_in_flight(self) -> list[str]:
+        """
+        Routes of the requests in flight whose endpoint runs on the event loop.
+        Sync endpoints run in the threadpool and can't block the loop.
+        """
+        routes = set()
+        for scope in list(self._in_flight.values()):
+            endpoint = scope.get("endpoint")
+            if endpoint is not None and not inspect.iscoroutinefunction(endpoint):
+                continue
+            route = scope.get("route")
+            routes.add(f"{scope.get('method', '')} {getattr(route, 'path', scope.get('path'))}")
+        return sorted(routes)
+
+    @contextmanager
+    def track(self, scope: dict):
+        """
+        Register a request as in flight while the block runs.
+        """
+        key = id(scope)
+        self._in_flight[key] = scope
+        try:
+            yield
+        finally:
+            self._in_flight.pop(key, None)
+
+    def stats(self) -> dict:
+        return {
+            "last_lag_ms": round(self.last_lag * 1000, 3),
+            "max_lag_ms": round(self.max_lag * 1000, 3),
+            "avg_lag_ms": round(self.total_lag / self.heartbeats * 1000, 3) if self.heartbeats else 0.0,
+            "heartbeats": self.heartbeats,
+            "stalls": self.stalls,
+            "stalls_by_route": dict(self.route_stalls),
+        }
+
+
+loop_monitor = LoopLagMonitor()
+
+
+class LoopMonitorMiddleware:
+    """
+    ASGI middleware registering every HTTP request with the loop monitor while it's handled.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        with loop_monitor.track(scope):
+            await self.app(scope, receive, send)
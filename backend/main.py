@@ -5,50 +5,77 @@ This is the entry point for the FastAPI application.
 It sets up routes, middlewares, and application configuration.
 """
 
-from fastapi import FastAPI, Depends, HTTPException, Body, Response, Request
+from fastapi import FastAPI, Depends, HTTPException, Body, Response, Request, Query, UploadFile, File, Form
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
 from sqlalchemy.orm import Session
-from typing import List
-from datetime import datetime, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import date, datetime, timedelta
 from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
 import crud
+import async_crud
 import os
 import email_functions
-from database import SessionLocal
+import outbox
+import image_pipeline
+import search
+from rate_limit_storage import RATE_LIMIT_STORAGE_URI, RATE_LIMIT_LOGIN, RATE_LIMIT_REGISTER, RATE_LIMIT_CONTACT
+from pool_metrics import pool_stats
+from tracing import TracingMiddleware
+from metrics import MetricsMiddleware, request_metrics, check_scrape_token, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from loop_monitor import loop_monitor, LoopMonitorMiddleware
+from cache import cached_json_response, response_cache
+from database import SessionLocal, AsyncSessionLocal, async_engine
 from schemas import SeminarCreate, SeminarOut, ContactForm, LocationCreate, LocationOut, ParticipantAdd, SeminarRegistrationForm, LoginData, ParticipantOut
-from auth import authenticate_admin, create_access_token, check_admin_token
-from fastapi.responses import StreamingResponse, FileResponse
-from fastapi.staticfiles import StaticFiles
-from pdf_utils import generate_participants_list_pdf
-
-app = FastAPI()
-
-frontend_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../frontend/dist"))
-
-# Serve static frontend
-app.mount("/", StaticFiles(directory=frontend_path, html=True), name="static")
-
-@app.get("/{full_path:path}")
-async def spa_handler():
-    return FileResponse(os.path.join(frontend_path, "index.html"))
-
-
-# Rate limiter
-limiter = Limiter(key_func=get_remote_address)
+from auth import authenticate_admin_async, create_access_token, check_admin_token, revoke_token, shutdown_password_executor
+from fastapi.responses import StreamingResponse, FileResponse, JSONResponse
+from static_files import PrecompressedStaticFiles
+from pdf_utils import participants_pdf_cache, stream_participant_lists_zip
+from render_pool import shutdown_render_pool
+from certificate_utils import generate_certificates_pdf, stream_certificates_zip
+from export_utils import stream_participants_csv, stream_participants_xlsx
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Deliver queued emails in the background
+    outbox.worker.start()
+    # Measure event loop lag caused by blocking code
+    loop_monitor.start()
+    # Generate missing image derivatives in the background
+    if image_pipeline.IMAGE_WARMUP:
+        image_pipeline.warm_up()
+    yield
+    await loop_monitor.stop()
+    outbox.worker.stop()
+    email_functions.smtp_pool.close()
+    shutdown_password_executor()
+    shutdown_render_pool()
+    await async_engine.dispose()
+
+app = FastAPI(lifespan=lifespan)
+
+# Rate limiter, the moving window counters are shared by all workers (see rate_limit_storage.py)
+limiter = Limiter(key_func=get_remote_address, storage_uri=RATE_LIMIT_STORAGE_URI, strategy="moving-window")
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
 app.add_middleware(SlowAPIMiddleware)
+app.add_middleware(LoopMonitorMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["https://localhost:5173", "https://localhost:8000", "127.0.0.1"],  # Frontend url
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count", "ETag"],
 )
+# Outermost, so the latency includes all other middlewares
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TracingMiddleware)
 
 def get_db():
     db = SessionLocal()
@@ -57,57 +84,129 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
 # Verfiy admin session
 def verify_admin_session(request: Request):
     token = request.cookies.get("access_token")
     if not token or not check_admin_token(token):
         raise HTTPException(status_code=401)
 
+# Filters of the seminar listing
+def seminar_filters(
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    location_id: Optional[int] = None,
+    city: Optional[str] = Query(None, max_length=127),
+    has_free_places: Optional[bool] = None,
+) -> dict:
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'.")
+    filters = dict(date_from=date_from, date_to=date_to, location_id=location_id, city=city, has_free_places=has_free_places)
+    return {name: value for name, value in filters.items() if value is not None}
+
 
 # ---------------------------------------------------------------------------- #
 #                            ENDPOINTS FOR SEMINARS                            #
 # ---------------------------------------------------------------------------- #
 @app.get("/seminars/", response_model=List[SeminarOut])
-def read_seminars(limit: int = 10, offset: int = 0, db: Session = Depends(get_db)):
+def read_seminars(
+    request: Request,
+    limit: int = 10,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    filters: dict = Depends(seminar_filters),
+    db: Session = Depends(get_db),
+):
     """
-    Retrieve a list of seminars.
+    Retrieve a list of seminars. The cursor of the next page is returned in the
+    'X-Next-Cursor' header, the header is missing on the last page.
+    Served from the response cache, supports conditional requests (ETag).
 
     Args:
+        request (Request): The incoming request, used as cache key.
         limit (int, optional): Maximum number of seminars in the list. Defaults to 10.
         offset (int, optional): Number of seminars to skip (for pagination). Defaults to 0.
+        cursor (str, optional): Cursor from 'X-Next-Cursor' to continue after the previous page, replaces offset.
+        filters (dict, optional): Query parameters 'from' and 'to' (dates), 'location_id', 'city' and 'has_free_places',
+            e.g. '?from=2025-06-01&has_free_places=true' for the upcoming seminars with free places.
         db (Session, optional): SQLAlchemy database session, automatically provided by dependency injection.
 
     Returns:
         List[SeminarOut]: A list of seminar objects with their metadata.
     """
-    return crud.get_seminars(db, limit, offset)
+    def load():
+        seminars, next_cursor = crud.get_seminars_page(db, limit, offset, cursor, **filters)
+        return seminars, {"X-Next-Cursor": next_cursor} if next_cursor else {}
+
+    return cached_json_response(request, load, tags=["seminars"])
+
+@app.get("/seminars/search", response_model=List[SeminarOut])
+def search_seminars(
+    request: Request,
+    q: str = Query(..., min_length=2, max_length=200),
+    limit: int = Query(10, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+):
+    """
+    Full-text search over the title and description of the seminars, best match first.
+    The total number of matches is returned in the 'X-Total-Count' header.
+    Served from the response cache, supports conditional requests (ETag).
+
+    Args:
+        request (Request): The incoming request, used as cache key.
+        q (str): The search text, words (German stemming), "phrases" and -excluded words.
+        limit (int, optional): Maximum number of seminars in the list. Defaults to 10.
+        offset (int, optional): Number of matches to skip (for pagination). Defaults to 0.
+        db (Session, optional): SQLAlchemy database session, automatically provided by dependency injection.
+
+    Returns:
+        List[SeminarOut]: The matching seminars with their metadata.
+    """
+    def load():
+        seminars, total = search.search_seminars(db, q, limit, offset)
+        return seminars, {"X-Total-Count": str(total)}
+
+    return cached_json_response(request, load, tags=["seminars"])
 
 @app.get("/seminar/{id}", response_model=SeminarOut)
-def read_seminars(id: int, db: Session = Depends(get_db)):
+def read_seminar(request: Request, id: int, db: Session = Depends(get_db)):
     """
-    Retrieve a single seminar by its id.
+    Retrieve a single seminar by its id. Served from the response cache, supports conditional requests (ETag).
 
     Args:
+        request (Request): The incoming request, used as cache key.
         id (int): ID of the seminar to retrieve.
         db (Session, optional): SQLAlchemy database session, automatically provided by dependency injection.
 
     Returns:
         SeminarOut: A seminar with its metadata.
     """
-    return crud.get_seminar_by_id(db, id)
+    return cached_json_response(
+        request,
+        lambda: (crud.get_seminar_by_id(db, id), {}),
+        tags=lambda seminar: [f"seminar:{id}", f"location:{seminar.location.location_id}", "seminar-details"],
+        # The revision changes with every edit and registration, the location is embedded
+        validator=lambda: (crud.get_seminar_revision(db, id), crud.get_table_versions(db, "locations")),
+    )
 
-@app.get("/seminars/count")
-def count_seminars(db: Session = Depends(get_db)) -> int:
+@app.get("/seminars/count", response_model=int)
+def count_seminars(request: Request, filters: dict = Depends(seminar_filters), db: Session = Depends(get_db)):
     """
-    Retrieve the number of seminars in the database.
+    Retrieve the number of seminars in the database. Served from the response cache, supports conditional requests (ETag).
 
     Args:
+        request (Request): The incoming request, used as cache key.
+        filters (dict, optional): The filters of the seminar listing, see 'read_seminars'.
         db (Session, optional): SQLAlchemy database session, automatically provided by dependency injection.
 
     Returns:
-        int: Number of seminars.
+        int: Number of (matching) seminars.
     """
-    return crud.count_seminars(db)
+    return cached_json_response(request, lambda: (crud.count_seminars(db, **filters), {}), tags=["seminars"])
 
 @app.post("/seminars/", response_model=SeminarCreate, dependencies=[Depends(verify_admin_session)])
 def add_seminar(seminar: SeminarCreate, db: Session = Depends(get_db)):
@@ -170,32 +269,44 @@ def add_location(location: LocationCreate, db: Session = Depends(get_db)):
     return crud.add_location(db, location)
 
 @app.get("/locations/", response_model=List[LocationOut])
-def get_locations(limit: int = 10, db: Session = Depends(get_db)):
+def get_locations(request: Request, limit: int = 10, db: Session = Depends(get_db)):
     """
-    Retrieve a list of locations with limit.
+    Retrieve a list of locations with limit. Served from the response cache, supports conditional requests (ETag).
 
     Args:
+        request (Request): The incoming request, used as cache key.
         limit (int, optional): Maximum number of locations in the list. Defaults to 10.
         db (Session, optional): SQLAlchemy database session, automatically provided by dependency injection.
 
     Returns:
         List[LocationOut]: A list of locations with their metadata.
     """
-    return crud.get_locations(db, limit)
+    return cached_json_response(
+        request,
+        lambda: ([crud.to_location_out(location) for location in crud.get_locations(db, limit)], {}),
+        tags=["locations"],
+        validator=lambda: crud.get_table_versions(db, "locations"),
+    )
 
 @app.get("/location/{id}", response_model=LocationOut)
-def get_location(id: int = 10, db: Session = Depends(get_db)):
+def get_location(request: Request, id: int = 10, db: Session = Depends(get_db)):
     """
-    Retrieve a single location by its ID.
+    Retrieve a single location by its ID. Served from the response cache, supports conditional requests (ETag).
 
     Args:
+        request (Request): The incoming request, used as cache key.
         id (int, optional): ID of the location to retrieve. Defaults to 10.
         db (Session, optional): SQLAlchemy database session, automatically provided by dependency injection.
 
     Returns:
         LocationOut: The retrieved location object.
     """
-    return crud.get_location_by_id(db, id)
+    return cached_json_response(
+        request,
+        lambda: (crud.to_location_out(crud.get_location_by_id(db, id)), {}),
+        tags=[f"location:{id}"],
+        validator=lambda: crud.get_table_versions(db, "locations"),
+    )
 
 @app.delete("/locations/delete/{id}", dependencies=[Depends(verify_admin_session)])
 def delete_location(id: int, db: Session = Depends(get_db)) -> dict:
@@ -244,56 +355,67 @@ def get_participants_of_seminar(seminar_id: int, db: Session = Depends(get_db)):
     return crud.get_participants(db, seminar_id)
 
 @app.get("/seminars/{seminar_id}/unregister")
-def unregister_participant(token: str, db: Session = Depends(get_db)) -> str:
+async def unregister_participant(token: str, db: AsyncSession = Depends(get_async_db)) -> str:
     """
     Unregister a participant from a seminar.
 
     Args:
         token (str): Token of the participant.
-        db (Session, optional): SQLAlchemy database session, automatically provided by dependency injection.
+        db (AsyncSession, optional): SQLAlchemy async database session, automatically provided by dependency injection.
 
     Returns:
         str: A string with a success/error message in German.
     """
-    return crud.unregister_participant(db, token)
+    return await async_crud.unregister_participant(db, token)
 
 # ---------------------------------------------------------------------------- #
 #                              FORM PROCESSING                                 #
 # ---------------------------------------------------------------------------- #
 @app.post("/kontakt/")
-async def send_form(form: ContactForm):
+@limiter.limit(RATE_LIMIT_CONTACT)
+async def send_form(request: Request, form: ContactForm, db: AsyncSession = Depends(get_async_db)):
     """
-    Send the contact form to the admin email address.
+    Queue the contact form for delivery to the admin email address.
+    Rate limited per client address (RATE_LIMIT_CONTACT).
 
     Args:
+        request (Request): The incoming request, used by the rate limiter.
         form (ContactForm): The form data with contact information.
+        db (AsyncSession, optional): SQLAlchemy async database session, automatically provided by dependency injection.
     """
-    email_functions.send_form(form)
+    outbox.enqueue_email(db, email_functions.build_form(form))
+    await db.commit()
+    outbox.worker.wake()
 
 # ---------------------------------------------------------------------------- #
 #                             SEMINAR REGISTRATION                             #
 # ---------------------------------------------------------------------------- #
 @app.post("/seminars/{seminar_id}/register")
+@limiter.limit(RATE_LIMIT_REGISTER)
 async def register_for_seminar(
+    request: Request,
     seminar_id: int,
     data: SeminarRegistrationForm = Body(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Register a participant for a seminar.
+    Rate limited per client address (RATE_LIMIT_REGISTER).
 
     Args:
+        request (Request): The incoming request, used by the rate limiter.
         seminar_id (int): TID of the seminar the participant wants to register for.
         data (SeminarRegistrationForm): The participant's registration data.
-        db (Session, optional): SQLAlchemy database session, automatically provided by dependency injection.
+        db (AsyncSession, optional): SQLAlchemy async database session, automatically provided by dependency injection.
 
     Raises:
         HTTPException 404: If the seminar does not exist.
-        HTTPException 403: If registration is closed (i.e., the seminar is in the past or no free places left).
+        HTTPException 403: If registration is closed (i.e., the seminar is in the past).
+        HTTPException 409: If the seminar is fully booked.
         
     """
     # Fetch seminar using the database session
-    seminar = crud.get_seminar_by_id(db, seminar_id)
+    seminar = await async_crud.get_seminar_by_id(db, seminar_id)
     
     if not seminar:
         raise HTTPException(status_code=404, detail="Seminar not found.")
@@ -309,29 +431,33 @@ async def register_for_seminar(
                                  email=data.email,
                                  remarks=data.remarks,
                                  seminar_id=seminar_id)
-    participant_registered = crud.add_participant(db, participant)
+    participant_registered = await async_crud.add_participant(db, participant, commit=False)
     unregister_url = f"https://localhost:8000/seminars/{seminar.seminar_id}/unregister?token={participant_registered.token}"
     
     # Confirmation email to user
-    email_functions.send_confirmation(data, seminar, unregister_url)
+    outbox.enqueue_email(db, email_functions.build_confirmation(data, seminar, unregister_url))
     
-    participants = crud.get_participants(db, seminar_id)
+    participants = await async_crud.get_participants(db, seminar_id)
     
     # Email to inform admin about registration
-    email_functions.send_registration_info(data, seminar, participants)
+    outbox.enqueue_email(db, email_functions.build_registration_info(data, seminar, participants))
+
+    # Participant and emails are committed together, the outbox worker sends the emails
+    await db.commit()
+    outbox.worker.wake()
 
 
 # ---------------------------------------------------------------------------- #
 #                                     ADMIN                                    #
 # ---------------------------------------------------------------------------- #
 @app.post("/admin/token")
-@limiter.limit("3/hour")
+@limiter.limit(RATE_LIMIT_LOGIN)
 async def login_admin(request: Request, response: Response, data: LoginData) -> dict:
     """
     Authenticate an admin and set a secure session cookie.
 
     Verifies the provided login credentials and, if valid, issues a JWT access token
-    stored in a secure HTTP-only session cookie. Rate limited to 3 requests per hour.
+    stored in a secure HTTP-only session cookie. Rate limited to 3 requests per hour by default (RATE_LIMIT_LOGIN).
 
     Args:
         response (Response): The response object used to set the session cookie.
@@ -339,11 +465,13 @@ async def login_admin(request: Request, response: Response, data: LoginData) ->
 
     Raises:
         HTTPException 401: If authentication fails (invalid credentials).
+        HTTPException 503: If too many logins are being verified at the same time.
 
     Returns:
         dict: A message indicating whether login was successful.
     """
-    user = authenticate_admin(data.username, data.password)
+    # bcrypt takes several hundred milliseconds, keep it off the event loop
+    user = await authenticate_admin_async(data.username, data.password)
     
     if not user:
         raise HTTPException(status_code=401)
@@ -366,16 +494,18 @@ async def login_admin(request: Request, response: Response, data: LoginData) ->
     return {"message": "Login successful"}
 
 @app.post("/admin/logout", dependencies=[Depends(verify_admin_session)])
-def logout(response: Response) -> dict:
+def logout(request: Request, response: Response) -> dict:
     """
-    Delete the session cookie of an admin.
+    Delete the session cookie of an admin and revoke its access token.
 
     Args:
+        request (Request): Request object used to get the session cookie.
         response (Response): The response object used to delete the session cookie.
 
     Returns:
         dict: A success message.
     """
+    revoke_token(request.cookies.get("access_token"))
     response.delete_cookie(
         key="access_token",
         path="/",
@@ -404,27 +534,341 @@ def check_admin(request: Request) -> dict:
         raise HTTPException(status_code=401, detail="access denied")
     return check_admin_token(token)
 
+@app.post("/admin/outbox/requeue", dependencies=[Depends(verify_admin_session)])
+def requeue_dead_emails(db: Session = Depends(get_db)) -> dict:
+    """
+    Put all emails that could not be delivered (dead-letter) back into the outbox.
+
+    Args:
+        db (Session, optional): SQLAlchemy database session, automatically provided by dependency injection.
+
+    Returns:
+        dict: A dictionary with "requeued" key and the number of requeued emails.
+    """
+    count = outbox.requeue_dead_emails(db)
+    outbox.worker.wake()
+    return {"requeued": count}
+
+@app.get("/admin/cache/stats", dependencies=[Depends(verify_admin_session)])
+def get_cache_stats() -> dict:
+    """
+    Retrieve the hit/miss counters and size of the response cache.
+
+    Returns:
+        dict: Dictionary with "entries", "bytes", "hits", "misses" and "evictions".
+    """
+    return response_cache.stats()
+
+@app.get("/admin/loop/stats", dependencies=[Depends(verify_admin_session)])
+def get_loop_stats() -> dict:
+    """
+    Retrieve the event loop lag measured by the loop monitor.
+
+    Returns:
+        dict: Lag statistics in milliseconds and the number of stalls per async route.
+    """
+    return loop_monitor.stats()
+
+@app.get("/admin/pool/stats", dependencies=[Depends(verify_admin_session)])
+def get_pool_stats() -> dict:
+    """
+    Retrieve the metrics of the database connection pools.
+
+    Returns:
+        dict: Checkouts, wait times, overflow usage and invalidations per pool ("sync" and "async").
+    """
+    return pool_stats()
+
+@app.get("/metrics")
+def get_metrics(request: Request) -> Response:
+    """
+    Per-route request counts, latency histograms, requests in flight and SQL statements per request
+    in the Prometheus text format. Accessible with the admin session or, for Prometheus,
+    with 'Authorization: Bearer <METRICS_TOKEN>'.
+
+    Args:
+        request (Request): The incoming request with the session cookie or the Authorization header.
+
+    Raises:
+        HTTPException 401: If neither the scrape token nor the admin session is valid.
+
+    Returns:
+        Response: The metrics.
+    """
+    if not check_scrape_token(request.headers.get("authorization")):
+        verify_admin_session(request)
+    return Response(request_metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
 # ---------------------------------------------------------------------------- #
 #                                 PDF Download                                 #
 # ---------------------------------------------------------------------------- #
+
 @app.get("/admin/seminars/{seminar_id}/participants/pdf", dependencies=[Depends(verify_admin_session)])
-def download_participants_pdf(seminar_id: int, db: Session = Depends(get_db)) -> StreamingResponse:
+def download_participants_pdf(seminar_id: int, db: Session = Depends(get_db)) -> Response:
     """
     Creates a pdf containing information about the seminar and a table with the names
-    of the participants and field for signatures.
+    of the participants and field for signatures. The pdf is only rendered again if the
+    seminar or its participants changed since the last download.
 
     Args:
         seminar_id (int): ID of the seminar.
         db (Session, optional): SQLAlchemy database session, automatically provided by dependency injection.
 
     Returns:
-        StreamingResponse: PDF file as a downloadable stream.
+        Response: PDF file as a download.
     """
     seminar = crud.get_seminar_by_id(db, seminar_id)
-    participants = crud.get_participants(db, seminar_id)
-    
-    pdf_file = generate_participants_list_pdf(seminar, participants)
+    revision = crud.get_seminar_revision(db, seminar_id)
+
+    pdf_file = participants_pdf_cache.get_or_render(seminar, revision, lambda: crud.get_participants(db, seminar_id))
 
-    return StreamingResponse(pdf_file, media_type="application/pdf", headers={
+    return Response(pdf_file, media_type="application/pdf", headers={
         "Content-Disposition": f"attachment; filename=Teilnehmerliste_{seminar_id}.pdf"
     })
+
+@app.get("/admin/participants/pdf", dependencies=[Depends(verify_admin_session)])
+def download_participant_lists_zip(date_from: date, date_to: date, db: Session = Depends(get_db)) -> StreamingResponse:
+    """
+    Download the participant lists of all seminars within a date range as one ZIP file.
+    The lists are rendered in parallel and the ZIP file is streamed while they are rendered.
+
+    Args:
+        date_from (date): First day of the range.
+        date_to (date): Last day of the range (inclusive).
+        db (Session, optional): SQLAlchemy database session, automatically provided by dependency injection.
+
+    Raises:
+        HTTPException 400: If date_from is after date_to.
+        HTTPException 404: If there are no seminars within the date range.
+
+    Returns:
+        StreamingResponse: ZIP file as a downloadable stream.
+    """
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="date_from must not be after date_to.")
+
+    participant_lists = crud.get_participant_lists(db, date_from, date_to)
+    if not participant_lists:
+        raise HTTPException(status_code=404, detail="No seminars found in the given date range.")
+
+    return StreamingResponse(stream_participant_lists_zip(participant_lists), media_type="application/zip", headers={
+        "Content-Disposition": f"attachment; filename=Teilnehmerlisten_{date_from.isoformat()}_{date_to.isoformat()}.zip"
+    })
+
+@app.get("/admin/seminars/{seminar_id}/certificates.pdf", dependencies=[Depends(verify_admin_session)])
+def download_certificates_pdf(seminar_id: int, db: Session = Depends(get_db)) -> Response:
+    """
+    Create the attendance certificates of all participants of a seminar as one PDF,
+    one page per participant.
+
+    Args:
+        seminar_id (int): ID of the seminar.
+        db (Session, optional): SQLAlchemy database session, automatically provided by dependency injection.
+
+    Raises:
+        HTTPException 404: If the seminar does not exist or has no participants.
+
+    Returns:
+        Response: PDF file as a download.
+    """
+    seminar = crud.get_seminar_by_id(db, seminar_id)
+    participants = [crud.to_participant_out(participant) for participant in crud.get_participants(db, seminar_id)]
+    if not participants:
+        raise HTTPException(status_code=404, detail=f"Seminar with id={seminar_id} has no participants.")
+
+    return Response(generate_certificates_pdf(seminar, participants), media_type="application/pdf", headers={
+        "Content-Disposition": f"attachment; filename=Teilnahmebescheinigungen_{seminar_id}.pdf"
+    })
+
+@app.get("/admin/seminars/{seminar_id}/certificates.zip", dependencies=[Depends(verify_admin_session)])
+def download_certificates_zip(seminar_id: int, db: Session = Depends(get_db)) -> StreamingResponse:
+    """
+    Create the attendance certificates of all participants of a seminar as ZIP file
+    with one PDF per participant.
+
+    Args:
+        seminar_id (int): ID of the seminar.
+        db (Session, optional): SQLAlchemy database session, automatically provided by dependency injection.
+
+    Raises:
+        HTTPException 404: If the seminar does not exist or has no participants.
+
+    Returns:
+        StreamingResponse: ZIP file as a downloadable stream.
+    """
+    seminar = crud.get_seminar_by_id(db, seminar_id)
+    participants = [crud.to_participant_out(participant) for participant in crud.get_participants(db, seminar_id)]
+    if not participants:
+        raise HTTPException(status_code=404, detail=f"Seminar with id={seminar_id} has no participants.")
+
+    return StreamingResponse(stream_certificates_zip(seminar, participants), media_type="application/zip", headers={
+        "Content-Disposition": f"attachment; filename=Teilnahmebescheinigungen_{seminar_id}.zip"
+    })
+
+
+# ---------------------------------------------------------------------------- #
+#                               Participant Export                             #
+# ---------------------------------------------------------------------------- #
+EXPORT_FORMATS = {
+    "csv": (stream_participants_csv, "text/csv; charset=utf-8"),
+    "xlsx": (stream_participants_xlsx, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+def _participants_export(seminar_ids: Optional[List[int]], file_format: str, filename: str) -> StreamingResponse:
+    stream, media_type = EXPORT_FORMATS[file_format]
+    return StreamingResponse(stream(seminar_ids), media_type=media_type, headers={
+        "Content-Disposition": f"attachment; filename={filename}.{file_format}"
+    })
+
+@app.get("/admin/seminars/{seminar_id}/participants.csv", dependencies=[Depends(verify_admin_session)])
+def download_participants_csv(seminar_id: int, db: Session = Depends(get_db)) -> StreamingResponse:
+    """
+    Export the participants of a seminar as CSV file, streamed from the database.
+
+    Args:
+        seminar_id (int): ID of the seminar.
+        db (Session, optional): SQLAlchemy database session, automatically provided by dependency injection.
+
+    Raises:
+        HTTPException 404: If the seminar does not exist.
+
+    Returns:
+        StreamingResponse: CSV file as a downloadable stream.
+    """
+    crud.get_seminar_by_id(db, seminar_id)
+    return _participants_export([seminar_id], "csv", f"Teilnehmerliste_{seminar_id}")
+
+@app.get("/admin/seminars/{seminar_id}/participants.xlsx", dependencies=[Depends(verify_admin_session)])
+def download_participants_xlsx(seminar_id: int, db: Session = Depends(get_db)) -> StreamingResponse:
+    """
+    Export the participants of a seminar as Excel file, streamed from the database.
+
+    Args:
+        seminar_id (int): ID of the seminar.
+        db (Session, optional): SQLAlchemy database session, automatically provided by dependency injection.
+
+    Raises:
+        HTTPException 404: If the seminar does not exist.
+
+    Returns:
+        StreamingResponse: XLSX file as a downloadable stream.
+    """
+    crud.get_seminar_by_id(db, seminar_id)
+    return _participants_export([seminar_id], "xlsx", f"Teilnehmerliste_{seminar_id}")
+
+@app.get("/admin/participants.{file_format}", dependencies=[Depends(verify_admin_session)])
+def download_all_participants(file_format: str, seminar_id: Optional[List[int]] = Query(None)) -> StreamingResponse:
+    """
+    Export the participants of several seminars as one CSV or Excel file, ordered by seminar date.
+
+    Args:
+        file_format (str): "csv" or "xlsx".
+        seminar_id (List[int], optional): IDs of the seminars (repeatable query parameter), all seminars if omitted.
+
+    Raises:
+        HTTPException 404: If the file format is not supported.
+
+    Returns:
+        StreamingResponse: The file as a downloadable stream.
+    """
+    if file_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=404, detail=f"Export format '{file_format}' is not supported.")
+    return _participants_export(seminar_id, file_format, "Teilnehmerliste")
+
+
+# ---------------------------------------------------------------------------- #
+#                                    IMAGES                                    #
+# ---------------------------------------------------------------------------- #
+@app.get("/images/{name}/manifest")
+def get_image_manifest(name: str) -> JSONResponse:
+    """
+    Retrieve the responsive derivatives (widths and formats) of an image, e.g. to build a srcset.
+
+    Args:
+        name (str): Name of the image, e.g. the image_name of a seminar.
+
+    Raises:
+        HTTPException 404: If the image does not exist.
+
+    Returns:
+        JSONResponse: The manifest, with status 202 while the derivatives are generated.
+    """
+    manifest = image_pipeline.get_manifest(name)
+    if manifest is None:
+        raise HTTPException(status_code=404, detail=f"Image '{name}' not found.")
+    return JSONResponse(manifest, status_code=200 if manifest["status"] == "ready" else 202)
+
+@app.get("/images/{name}")
+def get_image(name: str, request: Request, w: Optional[int] = Query(None, ge=1, le=4096)) -> FileResponse:
+    """
+    Serve the smallest derivative of an image that is at least 'w' pixels wide, in the best
+    format the browser accepts (AVIF, WebP or JPEG). While the derivatives are generated,
+    the original image is served.
+
+    Args:
+        name (str): Name of the image, e.g. the image_name of a seminar.
+        request (Request): Request object used to get the Accept header.
+        w (int, optional): Required width in pixels, the largest derivative if omitted.
+
+    Raises:
+        HTTPException 404: If the image does not exist.
+
+    Returns:
+        FileResponse: The image file.
+    """
+    manifest = image_pipeline.get_manifest(name)
+    if manifest is None:
+        raise HTTPException(status_code=404, detail=f"Image '{name}' not found.")
+
+    variant = image_pipeline.pick_variant(manifest, w, request.headers.get("accept", "")) if manifest["status"] == "ready" else None
+    if variant is None:
+        return FileResponse(image_pipeline.find_source(name), headers={"Cache-Control": "no-cache"})
+
+    path = image_pipeline.derivative_path(manifest["hash"], f"{variant['width']}.{variant['format']}")
+    return FileResponse(path, media_type=variant["type"], headers={
+        "Cache-Control": "public, max-age=86400",
+        "Vary": "Accept",
+    })
+
+@app.get("/images/derivatives/{digest}/{filename}")
+def get_image_derivative(digest: str, filename: str) -> FileResponse:
+    """
+    Serve a derivative by its content addressed URL (see the manifest), cached forever.
+
+    Raises:
+        HTTPException 404: If the derivative does not exist.
+    """
+    path = image_pipeline.derivative_path(digest, filename)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Image not found.")
+    return FileResponse(path, headers={"Cache-Control": "public, max-age=31536000, immutable"})
+
+@app.post("/admin/images", status_code=202, dependencies=[Depends(verify_admin_session)])
+def upload_image(name: str = Form(...), file: UploadFile = File(...)) -> dict:
+    """
+    Upload a seminar image. The derivatives are generated in the background.
+
+    Args:
+        name (str): Name of the image, referenced by the image_name of the seminars.
+        file (UploadFile): JPEG, PNG or WebP image.
+
+    Raises:
+        HTTPException 400: If the name is invalid or the file is too large or not a supported image.
+
+    Returns:
+        dict: The manifest of the image with status "pending".
+    """
+    data = file.file.read(image_pipeline.IMAGE_MAX_UPLOAD_BYTES + 1)
+    try:
+        return image_pipeline.save_upload(name, data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+# ---------------------------------------------------------------------------- #
+#                                STATIC FRONTEND                               #
+# ---------------------------------------------------------------------------- #
+# Mounted last, so the API routes above take precedence over the catch-all mount.
+# Unknown paths without file extension get index.html (client side routing).
+frontend_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../frontend/dist"))
+app.mount("/", PrecompressedStaticFiles(directory=frontend_path), name="static")
@@ -0,0 +1,278 @@
+"""
+metrics.py
+
+Per-route request metrics in the Prometheus text format, served on '/metrics'.
+
+For every route (the path template, e.g. '/seminar/{id}', so the number of series stays
+bounded) the middleware counts the requests by status code, measures their latency and
+keeps the number of requests in flight. The SQL statements executed while a request is
+handled are counted through SQLAlchemy engine events and a context variable, so slowly
+growing query counts or query times (e.g. an N+1 pattern after a change) show up per route.
+The connection pool state and the event loop lag are exported as well.
+
+The metrics are kept per process, with several uvicorn workers each worker reports its own
+numbers (Prometheus sums them up when every worker is scraped, e.g. via separate ports).
+
+Classes:
+- Histogram: Cumulative histogram with fixed buckets.
+- RequestMetrics: Registry of all request metrics.
+- MetricsMiddleware: ASGI middleware recording every HTTP request.
+
+Functions:
+- instrument_sql: Registers the statement events on an engine.
+- check_scrape_token: Checks the bearer token of a Prometheus scrape (METRICS_TOKEN).
+- current_route: Method and route of the request the current code runs for.
+
+Exports:
+- request_metrics: The registry used by the middleware and the '/metrics' endpoint.
+"""
+
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from pool_metrics import pool_stats
+from loop_monitor import loop_monitor
+import bisect
+import os
+import secrets
+import threading
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Configuration
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")      # bearer token for Prometheus, else only the admin session is accepted
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)     # seconds
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)                                      # statements per request
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histogram:
+    """
+    Histogram with fixed upper bounds, rendered with cumulative buckets, '_sum' and '_count'.
+    """
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)     # the last one is +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def render(self, name: str, labels: str) -> list[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + ("+Inf",), self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f"{name}_sum{{{labels}}} {self.sum:.6f}")
+        lines.append(f"{name}_count{{{labels}}} {cumulative}")
+        return lines
+
+
+class _RequestSQL:
+    """
+    SQL statements of one request, shared with the threadpool through the context variable.
+    """
+    __slots__ = ("count", "seconds", "scope")
+
+    def __init__(self, scope: dict):
+        self.count = 0
+        self.seconds = 0.0
+        self.scope = scope
+
+_current_sql: ContextVar[_RequestSQL | None] = ContextVar("current_sql", default=None)
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class RequestMetrics:
+    """
+    Request counts, latencies, requests in flight and SQL statements per (method, route).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = {}          # (method, route, status) -> count
+        self.latency = {}           # (method, route) -> Histogram of seconds
+        self.queries = {}           # (method, route) -> Histogram of statements per request
+        self.query_time = {}        # (method, route) -> Histogram of SQL seconds per request
+        self.in_flight = 0
+        self.sql_outside_requests = 0
+
+    def start(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def finish(self, method: str, route: str, status: str, seconds: float, sql: _RequestSQL):
+        """
+        Record a finished request.
+        """
+        key = (method, route)
+        with self._lock:
+            self.in_flight -= 1
+            self.requests[(method, route, status)] = self.requests.get((method, route, status), 0) + 1
+            self.latency.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(seconds)
+            self.queries.setdefault(key, Histogram(QUERY_COUNT_BUCKETS)).observe(sql.count)
+            self.query_time.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(sql.seconds)
+
+    def render(self) -> str:
+        """
+        Returns:
+            str: All metrics in the Prometheus text exposition format.
+        """
+        lines = []
+
+        def family(name: str, metric_type: str, help_text: str):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+
+        with self._lock:
+            family("http_requests_total", "counter", "HTTP requests by route and status code.")
+            for (method, route, status), count in sorted(self.requests.items()):
+                lines.append(f'http_requests_total{{method="{method}",route="{_label(route)}",status="{status}"}} {count}')
+
+            family("http_requests_in_flight", "gauge", "HTTP requests being handled.")
+            lines.append(f"http_requests_in_flight {self.in_flight}")
+
+            for name, histograms, metric_help in (
+                ("http_request_duration_seconds", self.latency, "Latency of the HTTP requests."),
+                ("http_request_db_queries", self.queries, "SQL statements executed per HTTP request."),
+                ("http_request_db_query_seconds", self.query_time, "Total SQL execution time per HTTP request."),
+            ):
+                family(name, "histogram", metric_help)
+                for (method, route), histogram in sorted(histograms.items()):
+                    lines.extend(histogram.render(name, f'method="{method}",route="{_label(route)}"'))
+
+            family("db_queries_outside_requests_total", "counter", "SQL statements of background tasks (e.g. the outbox).")
+            lines.append(f"db_queries_outside_requests_total {self.sql_outside_requests}")
+
+        pools = pool_stats()
+        for name, key, metric_type, help_text in (
+            ("db_pool_checked_out", "checked_out", "gauge", "Connections currently checked out."),
+            ("db_pool_overflow", "overflow", "gauge", "Current overflow connections."),
+            ("db_pool_timeouts_total", "timeouts", "counter", "Checkouts that timed out waiting for a connection."),
+            ("db_pool_wait_ms_max", "wait_ms_max", "gauge", "Longest wait for a connection in milliseconds."),
+        ):
+            family(name, metric_type, help_text)
+            for pool, stats in sorted(pools.items()):
+                if key in stats:
+                    lines.append(f'{name}{{pool="{pool}"}} {stats[key]}')
+
+        loop = loop_monitor.stats()
+        family("event_loop_lag_max_ms", "gauge", "Largest measured event loop lag in milliseconds.")
+        lines.append(f"event_loop_lag_max_ms {loop['max_lag_ms']}")
+        family("event_loop_stalls_total", "counter", "Event loop lags above the threshold.")
+        lines.append(f"event_loop_stalls_total {loop['stalls']}")
+
+        return "\n".join(lines) + "\n"
+
+
+request_metrics = RequestMetrics()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["metrics_query_start"].pop()
+    sql = _current_sql.get()
+    if sql is None:
+        request_metrics.sql_outside_requests += 1
+        return
+    sql.count += 1
+    sql.seconds += elapsed
+
+def _handle_error(context):
+    # Failed statements don't reach 'after_cursor_execute'
+    starts = context.connection.info.get("metrics_query_start") if context.connection is not None else None
+    if starts:
+        starts.pop()
+
+def instrument_sql(engine: Engine):
+    """
+    Count the statements of an engine and measure their time for the request they belong to.
+
+    Args:
+        engine (Engine): The (sync) engine, for async engines 'async_engine.sync_engine'.
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def check_scrape_token(authorization: str | None) -> bool:
+    """
+    Check the 'Authorization: Bearer <METRICS_TOKEN>' header of a scrape.
+
+    Args:
+        authorization (str | None): The Authorization header of the request.
+
+    Returns:
+        bool: True if METRICS_TOKEN is configured and the header contains it.
+    """
+    if not METRICS_TOKEN or not authorization:
+        return False
+    return secrets.compare_digest(authorization.encode(), f"Bearer {METRICS_TOKEN}".encode())
+
+
+def _route_of(scope: dict) -> str:
+    """
+    Path template of the matched route, 'unmatched' for unknown paths (not the raw path,
+    every 404 would create new series otherwise).
+    """
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    # Mounted apps (the static frontend) set the endpoint but no route
+    return "static" if scope.get("endpoint") is not None else "unmatched"
+
+
+def current_route() -> str | None:
+    """
+    Returns:
+        str | None: Method and route template of the current request (e.g. 'GET /seminar/{id}'),
+            None outside of requests (e.g. in the outbox worker).
+    """
+    sql = _current_sql.get()
+    if sql is None:
+        return None
+    return f"{sql.scope['method']} {_route_of(sql.scope)}"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording status, latency, requests in flight and SQL statements of every HTTP request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        method = scope["method"]
+        status = "500"
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        sql = _RequestSQL(scope)
+        token = _current_sql.set(sql)
+        request_metrics.start()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_metrics.finish(method, _route_of(scope), status, time.perf_counter() - start, sql)
+            _current_sql.reset(token)
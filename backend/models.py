@@ -7,6 +7,13 @@ Tables:
 - Seminar: Represents individual seminars including metadata, scheduling, and linked location.
 - Location: Represents physical locations where seminars take place.
 - Participant: Represents users registering for seminars, linked to a specific seminar.
+- EmailOutbox: Represents emails waiting to be delivered by the background outbox worker.
+- RevokedToken: Admin access tokens revoked on logout, shared by all uvicorn workers.
+- TableVersion: Version counter of the seminars and locations tables, bumped on every write (ETags, search index).
+
+Full-text search:
+- On PostgreSQL the seminars table gets a generated 'search_vector' column (tsvector of title
+  and description, German stemming) with a GIN index, see SEMINAR_SEARCH_DDL and search.py.
 
 Relationships:
 - A Seminar is optionally linked to one Location (many-to-one).
@@ -20,9 +27,10 @@ Notes:
 - Cascade rules are used to automatically handle deletions.
 """
 
-from sqlalchemy import Column, Integer, String, Text, Date, Time, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, Text, Date, Time, DateTime, ForeignKey, Float, Index, DDL, event
 from sqlalchemy.orm import relationship
 from database import Base
+from datetime import datetime
 
 # ------------------- Seminar Table -------------------
 class Seminar(Base):
@@ -37,6 +45,10 @@ class Seminar(Base):
     max_participants = Column(Integer, nullable=True)
     price = Column(Float, nullable=True)
     image_name = Column(String(63), nullable=True)
+    # Maintained by crud.add_participant / crud.unregister_participant, repair with repair_participants_count.py
+    participants_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # Incremented on every change of the seminar or its participants, part of the PDF cache key
+    revision = Column(Integer, nullable=False, default=0, server_default="0")
 
     # Foreign key to Location
     location_id = Column(Integer, ForeignKey("locations.location_id", ondelete="SET NULL", onupdate="CASCADE"), nullable=True)
@@ -47,6 +59,24 @@ class Seminar(Base):
     # One-to-many relationship with Participant
     participants = relationship("Participant", back_populates="seminar", cascade="all, delete-orphan", passive_deletes=True)
 
+    # Keyset pagination of the seminar listing orders by (date, seminar_id), the date filters
+    # of the listing are range scans on the same index, also per location with the second index
+    __table_args__ = (
+        Index("ix_seminars_date_seminar_id", "date", "seminar_id"),
+        Index("ix_seminars_location_id_date_seminar_id", "location_id", "date", "seminar_id"),
+    )
+
+# Full-text search column of the seminars (PostgreSQL only, SQLite uses the in-process index of search.py).
+# Not mapped, it is generated by the database and only used in the WHERE and ORDER BY of search.py.
+SEMINAR_SEARCH_DDL = [
+    "ALTER TABLE seminars ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('german'::regconfig, coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('german'::regconfig, coalesce(description, '')), 'B')) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_seminars_search_vector ON seminars USING GIN (search_vector)",
+]
+for statement in SEMINAR_SEARCH_DDL:
+    event.listen(Seminar.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+
 # ------------------- Location Table -------------------
 class Location(Base):
     __tablename__ = "locations"
@@ -63,6 +93,9 @@ class Location(Base):
     # One-to-many relationship with Seminar
     seminars = relationship("Seminar", back_populates="location")
 
+    # City filter of the seminar listing
+    __table_args__ = (Index("ix_locations_city", "city"),)
+
 # ------------------- Participant Table -------------------
 class Participant(Base):
     __tablename__ = "participants"
@@ -78,3 +111,40 @@ class Participant(Base):
 
     # Many-to-one relationship to Seminar
     seminar = relationship("Seminar", back_populates="participants")
+
+# ------------------- Email Outbox Table -------------------
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+
+    email_id = Column(Integer, primary_key=True, index=True)
+    recipient = Column(String(255), nullable=False)
+    subject = Column(String(255), nullable=False)
+    raw_message = Column(Text, nullable=False)
+    # 'pending', 'sent' or 'dead'
+    status = Column(String(15), nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.now)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.now)
+    sent_at = Column(DateTime, nullable=True)
+
+    # The worker polls for pending emails that are due
+    __table_args__ = (Index("ix_email_outbox_status_next_attempt_at", "status", "next_attempt_at"),)
+
+# ------------------- Revoked Token Table -------------------
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+
+    # sha256 of the token, rows of expired tokens are deleted on the next logout
+    token_hash = Column(String(64), primary_key=True)
+    expires_at = Column(Integer, nullable=False, index=True)       # the 'exp' claim (unix time)
+
+# ------------------- Table Version Table -------------------
+class TableVersion(Base):
+    __tablename__ = "table_versions"
+
+    # Tables whose writes are versioned (participant changes bump Seminar.revision instead)
+    TABLES = ("seminars", "locations")
+
+    table_name = Column(String(63), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
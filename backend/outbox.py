@@ -0,0 +1,230 @@
+"""
+outbox.py
+
+Persistent email outbox for the FastAPI application.
+
+Endpoints don't talk to the SMTP server while handling a request. Instead they add
+their messages to the 'email_outbox' table in the same database transaction as their
+other changes (e.g. the new participant). A background worker delivers the pending
+messages, retries failed deliveries with exponential backoff and moves messages that
+keep failing into a dead-letter state, so a slow or unreachable mail server neither
+delays nor breaks registrations.
+
+Functions:
+- enqueue_email: Adds an email to the outbox (the caller commits).
+- deliver_pending: Delivers a batch of due emails and schedules retries for failed ones.
+- requeue_dead_emails: Puts all dead emails back into the pending state.
+
+Classes:
+- OutboxWorker: Background thread that periodically calls 'deliver_pending'.
+"""
+
+from datetime import datetime, timedelta
+from email import message_from_string, policy
+from email.message import EmailMessage
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models import EmailOutbox
+from email_functions import send_emails
+from tracing import trace
+import logging
+import os
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", 5))     # seconds between polls
+BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", 20))            # emails per transaction
+MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 8))         # attempts before dead-letter
+BACKOFF_BASE = float(os.getenv("OUTBOX_BACKOFF_BASE", 30))      # seconds, doubled per attempt
+BACKOFF_MAX = float(os.getenv("OUTBOX_BACKOFF_MAX", 60 * 60))   # upper bound for the delay
+CLAIM_TIMEOUT = float(os.getenv("OUTBOX_CLAIM_TIMEOUT", 10 * 60))  # seconds a claimed batch may take to send
+
+STATUS_PENDING = "pending"
+STATUS_SENT = "sent"
+STATUS_DEAD = "dead"
+
+
+def enqueue_email(db: Session, message: EmailMessage) -> EmailOutbox:
+    """
+    Add an email to the outbox. The email is only stored, the caller is responsible
+    for committing the session so the email is persisted together with the other changes.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        message (EmailMessage): A message with content and headers.
+
+    Returns:
+        EmailOutbox: The queued email.
+    """
+    email = EmailOutbox(
+        recipient=str(message["To"]),
+        subject=str(message["Subject"])[:255],
+        raw_message=message.as_string(),
+        status=STATUS_PENDING,
+        attempts=0,
+        next_attempt_at=datetime.now(),
+    )
+    db.add(email)
+    return email
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    """
+    Exponential backoff for the given number of failed attempts.
+    """
+    return timedelta(seconds=min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX))
+
+
+def _claim_batch(db: Session, batch_size: int) -> list:
+    """
+    Claim up to 'batch_size' due emails in one short transaction by moving their
+    'next_attempt_at' to the end of the claim (CLAIM_TIMEOUT). Other workers skip them
+    until then, if this worker dies while sending they become due again afterwards.
+    """
+    now = datetime.now()
+    due = (
+        select(EmailOutbox.email_id)
+        .where(EmailOutbox.status == STATUS_PENDING, EmailOutbox.next_attempt_at <= now)
+        .order_by(EmailOutbox.next_attempt_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    # One statement, so two workers can't claim the same row (SQLite ignores the row locks)
+    claimed = db.execute(
+        update(EmailOutbox)
+        .where(EmailOutbox.email_id.in_(due), EmailOutbox.next_attempt_at <= now)
+        .values(next_attempt_at=now + timedelta(seconds=CLAIM_TIMEOUT))
+        .returning(EmailOutbox.email_id, EmailOutbox.recipient, EmailOutbox.raw_message, EmailOutbox.attempts)
+    ).all()
+    db.commit()
+    return claimed
+
+
+def deliver_pending(db: Session, batch_size: int = BATCH_SIZE) -> int:
+    """
+    Deliver a batch of pending emails that are due. Failed emails are rescheduled
+    with exponential backoff, after 'MAX_ATTEMPTS' failures they are marked as dead.
+
+    The batch is claimed and committed first, so no transaction or row lock is held while
+    the emails are sent over one pooled SMTP session. The results are recorded in a second
+    short transaction. Several workers (e.g. one per uvicorn process) never claim the same
+    email at the same time.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        batch_size (int, optional): Maximum number of emails to process. Defaults to BATCH_SIZE.
+
+    Returns:
+        int: Number of emails processed (sent or failed).
+    """
+    emails = _claim_batch(db, batch_size)
+    if not emails:
+        return 0
+
+    with trace("outbox.deliver", emails=len(emails)):
+        _send_batch(db, emails)
+    return len(emails)
+
+
+def _send_batch(db: Session, emails: list):
+    """
+    Send the claimed emails and record the results.
+    """
+    errors = send_emails([message_from_string(email.raw_message, policy=policy.default) for email in emails])
+
+    for email, error in zip(emails, errors):
+        attempts = email.attempts + 1
+        values = {EmailOutbox.attempts: attempts}
+        if error:
+            values[EmailOutbox.last_error] = str(error)
+            if attempts >= MAX_ATTEMPTS:
+                values[EmailOutbox.status] = STATUS_DEAD
+                logger.error("Email %s to %s moved to dead-letter after %s attempts: %s",
+                             email.email_id, email.recipient, attempts, error)
+            else:
+                values[EmailOutbox.next_attempt_at] = datetime.now() + _retry_delay(attempts)
+                logger.warning("Email %s to %s failed (attempt %s), retrying at %s: %s",
+                               email.email_id, email.recipient, attempts, values[EmailOutbox.next_attempt_at], error)
+        else:
+            values.update({EmailOutbox.status: STATUS_SENT, EmailOutbox.sent_at: datetime.now(), EmailOutbox.last_error: None})
+        db.query(EmailOutbox).filter(EmailOutbox.email_id == email.email_id).update(values, synchronize_session=False)
+
+    db.commit()
+
+
+def requeue_dead_emails(db: Session) -> int:
+    """
+    Put all dead emails back into the outbox, e.g. after the SMTP credentials were fixed.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+
+    Returns:
+        int: Number of requeued emails.
+    """
+    count = (
+        db.query(EmailOutbox)
+        .filter(EmailOutbox.status == STATUS_DEAD)
+        .update({
+            EmailOutbox.status: STATUS_PENDING,
+            EmailOutbox.attempts: 0,
+            EmailOutbox.next_attempt_at: datetime.now(),
+        }, synchronize_session=False)
+    )
+    db.commit()
+    return count
+
+
+class OutboxWorker:
+    """
+    Background thread delivering the outbox. It polls every 'poll_interval' seconds
+    and can be woken up early with 'wake' right after new emails were committed.
+    """
+
+    def __init__(self, session_factory=SessionLocal, poll_interval: float = POLL_INTERVAL):
+        self._session_factory = session_factory
+        self._poll_interval = poll_interval
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="email-outbox", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10):
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def wake(self):
+        self._wake_event.set()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                db = self._session_factory()
+                try:
+                    # Keep going while full batches are returned
+                    while deliver_pending(db) == BATCH_SIZE and not self._stop_event.is_set():
+                        pass
+                finally:
+                    db.close()
+            except Exception:
+                logger.exception("Email outbox worker failed")
+
+            self._wake_event.wait(self._poll_interval)
+            self._wake_event.clear()
+
+
+worker = OutboxWorker()
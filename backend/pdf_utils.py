@@ -4,14 +4,63 @@ pdf_utils.py
 
 This serves the purpose of creating a pdf containing information about the seminar,
 a table with the names of the participants and a field for each participant to put their signature.
+
+Rendered PDFs are kept in a bounded cache (in memory, optionally spilled to PDF_CACHE_DIR) keyed by
+the seminar id, its revision and a hash of the seminar data, so repeated downloads of an unchanged
+list are served without rendering it again.
+
+Several participant lists can be rendered in parallel in the render process pool (see render_pool.py)
+and streamed as ZIP file while they are rendered.
+
+Classes:
+- PDFCache: Bounded cache of rendered PDFs in memory with optional on-disk spill.
+- ZipStream: Unseekable file object to stream a ZIP file while it's written.
+
+Functions:
+- generate_participants_list_pdf: Renders the participant list of a seminar.
+- render_participants_list_pdf: Same, returns the bytes (used in the render processes).
+- stream_participant_lists_zip: Renders the participant lists of several seminars and yields a ZIP file.
+
+Exports:
+- participants_pdf_cache: The cache used for the participant lists.
 """
 from reportlab.lib.pagesizes import A4
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
 from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.lib import colors
+from concurrent.futures import as_completed
 from io import BytesIO
-from typing import List
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Tuple
 from schemas import ParticipantOut, SeminarOut
+from cache import TTLCache
+from render_pool import get_render_pool
+from tracing import span
+import hashlib
+import os
+import tempfile
+import zipfile
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Configuration
+PDF_CACHE_TTL = float(os.getenv("PDF_CACHE_TTL", 24 * 60 * 60))                  # seconds
+PDF_CACHE_MAX_ENTRIES = int(os.getenv("PDF_CACHE_MAX_ENTRIES", 256))
+PDF_CACHE_MAX_BYTES = int(os.getenv("PDF_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR")                                        # disk spill is disabled if not set
+PDF_CACHE_DIR_MAX_FILES = int(os.getenv("PDF_CACHE_DIR_MAX_FILES", 1000))
+
+# Styles are created once and shared by all documents (they are only read while rendering)
+STYLES = getSampleStyleSheet()
+PARTICIPANTS_TABLE_STYLE = TableStyle([
+    ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
+    ("TEXTCOLOR", (0, 0), (-1, 0), colors.black),
+    ("ALIGN", (0, 0), (-1, -1), "LEFT"),
+    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+    ("BOTTOMPADDING", (0, 0), (-1, 0), 10),
+    ("GRID", (0, 0), (-1, -1), 0.8, colors.grey),
+])
 
 def generate_participants_list_pdf(seminar: SeminarOut, participants: List[ParticipantOut]) -> BytesIO:
     """
@@ -30,7 +79,7 @@ def generate_participants_list_pdf(seminar: SeminarOut, participants: List[Parti
                             rightMargin=40, leftMargin=40,
                             topMargin=40, bottomMargin=40)
 
-    styles = getSampleStyleSheet()
+    styles = STYLES
     elements = []
 
     # Seminar title displayed on the top
@@ -66,17 +115,172 @@ def generate_participants_list_pdf(seminar: SeminarOut, participants: List[Parti
 
     # Table creation
     table = Table(data, colWidths=[240, 240,])
-    table.setStyle(TableStyle([
-        ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
-        ("TEXTCOLOR", (0, 0), (-1, 0), colors.black),
-        ("ALIGN", (0, 0), (-1, -1), "LEFT"),
-        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-        ("BOTTOMPADDING", (0, 0), (-1, 0), 10),
-        ("GRID", (0, 0), (-1, -1), 0.8, colors.grey),
-    ]))
+    table.setStyle(PARTICIPANTS_TABLE_STYLE)
 
     elements.append(table)
 
     document.build(elements)
     buffer.seek(0)
     return buffer
+
+def render_participants_list_pdf(seminar: SeminarOut, participants: List[ParticipantOut]) -> bytes:
+    """
+    Render the participant list and return the PDF as bytes, which (unlike a BytesIO)
+    can be sent back from a render process.
+    """
+    return generate_participants_list_pdf(seminar, participants).getvalue()
+
+
+class PDFCache:
+    """
+    Bounded cache of rendered PDFs. The most recently used files are kept in memory
+    (see cache.TTLCache), if 'directory' is set every PDF is also written there, so it
+    survives evictions and restarts and is shared by all uvicorn workers. The directory
+    keeps at most 'max_files' files, the least recently written are deleted.
+    """
+
+    def __init__(self, ttl: float, max_entries: int, max_bytes: int,
+                 directory: Optional[str] = None, max_files: int = PDF_CACHE_DIR_MAX_FILES):
+        self.memory = TTLCache(ttl=ttl, max_entries=max_entries, max_bytes=max_bytes)
+        self.directory = Path(directory) if directory else None
+        self.max_files = max_files
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def make_key(seminar: SeminarOut, revision: int) -> str:
+        """
+        The seminar data is part of the key, because e.g. an edited location changes the PDF
+        without changing the seminar's revision.
+        """
+        content = hashlib.sha256(repr(seminar).encode()).hexdigest()[:16]
+        return f"participants-{seminar.seminar_id}-{revision}-{content}"
+
+    def get(self, key: str) -> Optional[bytes]:
+        pdf = self.memory.get(key)
+        if pdf is None and self.directory is not None:
+            try:
+                pdf = (self.directory / f"{key}.pdf").read_bytes()
+            except FileNotFoundError:
+                return None
+            self.memory.set(key, pdf, size=len(pdf))
+        return pdf
+
+    def set(self, key: str, pdf: bytes):
+        self.memory.set(key, pdf, size=len(pdf))
+        if self.directory is None:
+            return
+
+        # Write to a temporary file first, so other workers never read a partial file
+        with tempfile.NamedTemporaryFile(dir=self.directory, suffix=".tmp", delete=False) as file:
+            file.write(pdf)
+        os.replace(file.name, self.directory / f"{key}.pdf")
+        self._prune()
+
+    def _prune(self):
+        files = sorted(self.directory.glob("*.pdf"), key=lambda path: path.stat().st_mtime)
+        for path in files[:max(0, len(files) - self.max_files)]:
+            path.unlink(missing_ok=True)
+
+    def get_or_render(self, seminar: SeminarOut, revision: int, load_participants: Callable[[], List[ParticipantOut]]) -> bytes:
+        """
+        Return the cached participant list of a seminar, rendering it on a cache miss.
+
+        Args:
+            seminar (SeminarOut): The seminar with location info.
+            revision (int): Revision of the seminar (see crud.get_seminar_revision).
+            load_participants (Callable): Returns the participants, only called on a cache miss.
+
+        Returns:
+            bytes: The PDF file.
+        """
+        key = self.make_key(seminar, revision)
+        with span("pdf.participants_list", seminar_id=seminar.seminar_id) as current:
+            pdf = self.get(key)
+            if current is not None:
+                current.set(cache_hit=pdf is not None)
+            if pdf is None:
+                participants = load_participants()
+                with span("pdf.render", participants=len(participants)):
+                    pdf = render_participants_list_pdf(seminar, participants)
+                self.set(key, pdf)
+        return pdf
+
+
+participants_pdf_cache = PDFCache(
+    ttl=PDF_CACHE_TTL,
+    max_entries=PDF_CACHE_MAX_ENTRIES,
+    max_bytes=PDF_CACHE_MAX_BYTES,
+    directory=PDF_CACHE_DIR,
+)
+
+
+# ---------------------------------------------------------------------------- #
+#                                  ZIP EXPORT                                  #
+# ---------------------------------------------------------------------------- #
+class ZipStream:
+    """
+    Unseekable file object collecting the bytes written by 'zipfile.ZipFile', so the
+    archive can be streamed while it's written. zipfile then uses data descriptors
+    instead of seeking back to the local file headers.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def stream_participant_lists_zip(participant_lists: List[Tuple[SeminarOut, int, List[ParticipantOut]]]) -> Iterator[bytes]:
+    """
+    Yield a ZIP file with the participant lists of several seminars.
+
+    Cached lists are added first, the others are rendered in parallel in the render process pool
+    and added in the order they finish, so the download starts before all lists are rendered.
+    Rendered lists are added to the PDF cache.
+
+    Args:
+        participant_lists (List[Tuple[SeminarOut, int, List[ParticipantOut]]]): Seminar, revision and
+            participants of every list (see crud.get_participant_lists).
+
+    Yields:
+        bytes: The next part of the ZIP file.
+    """
+    stream = ZipStream()
+    pool = get_render_pool()
+
+    # PDFs are compressed already, so they are only stored
+    with zipfile.ZipFile(stream, "w", compression=zipfile.ZIP_STORED) as archive:
+        futures = {}
+        for seminar, revision, participants in participant_lists:
+            filename = f"Teilnehmerliste_{seminar.date.isoformat()}_{seminar.seminar_id}.pdf"
+            key = participants_pdf_cache.make_key(seminar, revision)
+            pdf = participants_pdf_cache.get(key)
+            if pdf is not None:
+                archive.writestr(filename, pdf)
+                yield stream.drain()
+            else:
+                futures[pool.submit(render_participants_list_pdf, seminar, participants)] = (filename, key)
+
+        try:
+            for future in as_completed(futures):
+                filename, key = futures[future]
+                pdf = future.result()
+                participants_pdf_cache.set(key, pdf)
+                archive.writestr(filename, pdf)
+                yield stream.drain()
+        finally:
+            # The client may have disconnected, don't render the remaining lists
+            for future in futures:
+                future.cancel()
+
+    yield stream.drain()
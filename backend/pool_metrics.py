@@ -0,0 +1,135 @@
+"""
+pool_metrics.py
+
+Instrumentation of the SQLAlchemy connection pools created in database.py.
+
+Counts checkouts, checkins, new connections, invalidations and checkout timeouts,
+and measures how long requests wait for a connection. Together with the live pool
+state (size, checked out connections, overflow) this shows whether the pool is sized
+correctly for the number of workers and detects pool exhaustion under load.
+
+Classes:
+- PoolMetrics: Counters of a single pool.
+
+Functions:
+- instrumented_pool_class: Creates a pool class that measures the checkout wait time.
+- instrument_engine: Registers the pool event listeners on an engine.
+- pool_stats: Returns the metrics and live state of all instrumented pools.
+"""
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool
+import threading
+import time
+
+
+class PoolMetrics:
+    """
+    Counters of one connection pool, updated by the pool events and 'instrumented_pool_class'.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.engine = None
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.soft_invalidations = 0
+        self.timeouts = 0
+        self.wait_count = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.overflow_max = 0
+
+    def record_wait(self, seconds: float, overflow: int):
+        with self._lock:
+            self.wait_count += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            self.overflow_max = max(self.overflow_max, overflow)
+
+    def increment(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def stats(self) -> dict:
+        pool = self.engine.pool if self.engine is not None else None
+        state = {}
+        if pool is not None and hasattr(pool, "checkedout"):
+            state = {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": pool.overflow(),
+            }
+        with self._lock:
+            return {
+                **state,
+                "overflow_max": self.overflow_max,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "soft_invalidations": self.soft_invalidations,
+                "timeouts": self.timeouts,
+                "wait_ms_avg": round(self.wait_seconds_total / self.wait_count * 1000, 3) if self.wait_count else 0.0,
+                "wait_ms_max": round(self.wait_seconds_max * 1000, 3),
+            }
+
+
+_metrics = {}   # name -> PoolMetrics
+
+
+def instrumented_pool_class(base: type[Pool], metrics: PoolMetrics) -> type[Pool]:
+    """
+    Create a subclass of a queue based pool class that measures how long getting a
+    connection takes (including the wait for a free connection) and counts timeouts.
+    The class keeps working after 'Pool.recreate', e.g. on engine.dispose().
+
+    Args:
+        base (type[Pool]): The pool class, e.g. QueuePool or AsyncAdaptedQueuePool.
+        metrics (PoolMetrics): The metrics of the pool.
+
+    Returns:
+        type[Pool]: The instrumented pool class.
+    """
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return base._do_get(self)
+        except exc.TimeoutError:
+            metrics.increment("timeouts")
+            raise
+        finally:
+            metrics.record_wait(time.perf_counter() - start, self.overflow())
+
+    return type(f"Instrumented{base.__name__}", (base,), {"_do_get": _do_get})
+
+
+def instrument_engine(engine: Engine, metrics: PoolMetrics):
+    """
+    Register the pool event listeners of an engine and make its metrics available in 'pool_stats'.
+
+    Args:
+        engine (Engine): The (sync) engine, for async engines 'async_engine.sync_engine'.
+        metrics (PoolMetrics): The metrics of the engine's pool.
+    """
+    metrics.engine = engine
+    _metrics[metrics.name] = metrics
+
+    event.listen(engine, "checkout", lambda *args: metrics.increment("checkouts"))
+    event.listen(engine, "checkin", lambda *args: metrics.increment("checkins"))
+    event.listen(engine, "connect", lambda *args: metrics.increment("connects"))
+    event.listen(engine, "invalidate", lambda *args: metrics.increment("invalidations"))
+    event.listen(engine, "soft_invalidate", lambda *args: metrics.increment("soft_invalidations"))
+
+
+def pool_stats() -> dict:
+    """
+    Returns:
+        dict: Metrics and live state of every instrumented pool, keyed by pool name.
+    """
+    return {name: metrics.stats() for name, metrics in _metrics.items()}
@@ -0,0 +1,183 @@
+"""
+rate_limit_storage.py
+
+Rate limit storage shared by all uvicorn workers of a host, without an external service.
+
+slowapi keeps its counters in memory by default, so every worker process has its own limits
+(with N workers a '3/hour' limit allows 3N logins per hour) and they start over after every
+restart. This storage keeps them in a local SQLite file (WAL mode) that all workers use, with
+atomic moving window counters: the timestamps of the hits within the window are stored and a
+hit is only accepted if fewer than 'limit' hits happened in the last window, checked and
+written in one write transaction ('BEGIN IMMEDIATE') so concurrent workers can't both take
+the last free slot. Fixed window counters (incr/get) are supported as well.
+
+The file is separate from the application database, so a limited request costs one local
+write and no database round trip. A client over its limit is remembered in process until
+its window frees up again, so rejected requests (e.g. a flood from one address) don't touch
+the file at all.
+
+Importing the module registers the 'sqlite' scheme with the limits library, e.g.
+RATE_LIMIT_STORAGE_URI=sqlite:////var/lib/seminars/rate_limits.db. Any other limits storage
+URI (e.g. redis://localhost:6379 for workers on several hosts) can be configured instead if
+its client is installed, 'memory://' restores the per process counters.
+
+Classes:
+- SQLiteStorage: limits storage backed by a SQLite file.
+
+Exports:
+- RATE_LIMIT_STORAGE_URI, RATE_LIMIT_LOGIN, RATE_LIMIT_REGISTER, RATE_LIMIT_CONTACT: The configuration used by main.py.
+"""
+
+from limits.storage import MovingWindowSupport, Storage
+from urllib.parse import urlparse
+from pathlib import Path
+import sqlite3
+import threading
+import os
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Configuration
+RATE_LIMIT_STORAGE_URI = os.getenv("RATE_LIMIT_STORAGE_URI", f"sqlite:///{Path(__file__).resolve().parent / 'rate_limits.db'}")
+RATE_LIMIT_LOGIN = os.getenv("RATE_LIMIT_LOGIN", "3/hour")
+RATE_LIMIT_REGISTER = os.getenv("RATE_LIMIT_REGISTER", "5/minute;20/hour")        # per client address
+RATE_LIMIT_CONTACT = os.getenv("RATE_LIMIT_CONTACT", "2/minute;10/hour")
+
+CLEANUP_INTERVAL = 60       # seconds between deletions of expired rows
+BUSY_TIMEOUT = 5000         # milliseconds to wait for the write lock of another worker
+
+
+class SQLiteStorage(Storage, MovingWindowSupport):
+    """
+    limits storage in a SQLite file, for the fixed window and the moving window strategy.
+    """
+
+    STORAGE_SCHEME = ["sqlite"]
+
+    def __init__(self, uri: str, wrap_exceptions: bool = False, **options):
+        # Like SQLAlchemy: 'sqlite:///relative.db' and 'sqlite:////absolute/path.db'
+        self.path = urlparse(uri).path[1:]
+        if not self.path:
+            raise ValueError("The SQLite rate limit storage needs a file, e.g. sqlite:///rate_limits.db")
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+
+        self._local = threading.local()
+        self._blocked = {}          # key -> time until which the key is known to be over its limit
+        self._last_cleanup = 0.0
+        with self._connection() as connection:
+            connection.executescript("""
+                CREATE TABLE IF NOT EXISTS counters (key TEXT PRIMARY KEY, count INTEGER NOT NULL, expires_at REAL NOT NULL);
+                CREATE TABLE IF NOT EXISTS hits (key TEXT NOT NULL, at REAL NOT NULL, expires_at REAL NOT NULL);
+                CREATE INDEX IF NOT EXISTS ix_hits_key_at ON hits (key, at);
+                CREATE INDEX IF NOT EXISTS ix_hits_expires_at ON hits (expires_at);
+            """)
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+    @property
+    def base_exceptions(self) -> type[Exception]:
+        return sqlite3.Error
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        The connection of the current thread (sqlite3 connections can't be shared between threads).
+        """
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # Autocommit, transactions are started explicitly where needed
+            connection = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT / 1000, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _cleanup(self, connection: sqlite3.Connection, now: float):
+        if now - self._last_cleanup < CLEANUP_INTERVAL:
+            return
+        self._last_cleanup = now
+        connection.execute("DELETE FROM counters WHERE expires_at <= ?", (now,))
+        connection.execute("DELETE FROM hits WHERE expires_at <= ?", (now,))
+        self._blocked = {key: until for key, until in self._blocked.items() if until > now}
+
+    # ----- Fixed window ----- #
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        now = time.time()
+        connection = self._connection()
+        self._cleanup(connection, now)
+        # One statement, so the read and the increment are atomic
+        return connection.execute("""
+            INSERT INTO counters (key, count, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT (key) DO UPDATE SET
+                count = CASE WHEN expires_at <= ? THEN excluded.count ELSE count + excluded.count END,
+                expires_at = CASE WHEN expires_at <= ? THEN excluded.expires_at ELSE expires_at END
+            RETURNING count
+        """, (key, amount, now + expiry, now, now)).fetchone()[0]
+
+    def get(self, key: str) -> int:
+        row = self._connection().execute(
+            "SELECT count FROM counters WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key: str) -> float:
+        now = time.time()
+        row = self._connection().execute(
+            "SELECT expires_at FROM counters WHERE key = ? AND expires_at > ?", (key, now)
+        ).fetchone()
+        return row[0] if row else now
+
+    # ----- Moving window ----- #
+    def acquire_entry(self, key: str, limit: int, expiry: int, amount: int = 1) -> bool:
+        if amount > limit:
+            return False
+        now = time.time()
+        if self._blocked.get(key, 0) > now:
+            return False
+
+        connection = self._connection()
+        self._cleanup(connection, now)
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            count, oldest = connection.execute(
+                "SELECT count(*), min(at) FROM hits WHERE key = ? AND at > ?", (key, now - expiry)
+            ).fetchone()
+            if count + amount > limit:
+                connection.execute("COMMIT")
+                # Nothing can be accepted before the oldest hit leaves the window
+                self._blocked[key] = oldest + expiry
+                return False
+            connection.executemany("INSERT INTO hits (key, at, expires_at) VALUES (?, ?, ?)",
+                                   [(key, now, now + expiry)] * amount)
+            connection.execute("COMMIT")
+            return True
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def get_moving_window(self, key: str, limit: int, expiry: int) -> tuple[float, int]:
+        now = time.time()
+        count, oldest = self._connection().execute(
+            "SELECT count(*), min(at) FROM hits WHERE key = ? AND at > ?", (key, now - expiry)
+        ).fetchone()
+        return (oldest if count else now), count
+
+    # ----- Maintenance ----- #
+    def check(self) -> bool:
+        try:
+            self._connection().execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self) -> int:
+        connection = self._connection()
+        removed = connection.execute("DELETE FROM counters").rowcount + connection.execute("DELETE FROM hits").rowcount
+        self._blocked.clear()
+        return removed
+
+    def clear(self, key: str) -> None:
+        connection = self._connection()
+        connection.execute("DELETE FROM counters WHERE key = ?", (key,))
+        connection.execute("DELETE FROM hits WHERE key = ?", (key,))
+        self._blocked.pop(key, None)
@@ -0,0 +1,47 @@
+"""
+render_pool.py
+
+Process pool for CPU-bound rendering (PDFs), shared by all endpoints of a uvicorn worker.
+
+Rendering in the request thread only uses one core and holds the GIL, which slows down every
+other request of the worker. The pool runs the rendering in separate processes instead.
+It is created on first use and uses the 'spawn' start method, because forking a process
+with running threads (SMTP pool, outbox worker, database connections) is unsafe.
+
+Functions:
+- get_render_pool: Returns the process pool, creating it on first use.
+- shutdown_render_pool: Stops the worker processes (called by the application lifespan).
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Configuration
+RENDER_POOL_SIZE = int(os.getenv("RENDER_POOL_SIZE", os.cpu_count() or 1))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_render_pool() -> ProcessPoolExecutor:
+    """
+    Returns:
+        ProcessPoolExecutor: The shared pool with RENDER_POOL_SIZE worker processes.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=RENDER_POOL_SIZE, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+def shutdown_render_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
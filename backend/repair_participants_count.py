@@ -0,0 +1,17 @@
+from sqlalchemy import inspect, text
+from database import engine, SessionLocal
+import crud
+
+# Add the counter columns to databases created before they existed
+columns = [column["name"] for column in inspect(engine).get_columns("seminars")]
+for column in ("participants_count", "revision"):
+    if column not in columns:
+        with engine.begin() as connection:
+            connection.execute(text(f"ALTER TABLE seminars ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0"))
+
+db = SessionLocal()
+try:
+    repaired = crud.repair_participants_counts(db)
+finally:
+    db.close()
+print(f"successfully repaired the participant count of {repaired} seminar(s)")
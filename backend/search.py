@@ -0,0 +1,191 @@
+"""
+search.py
+
+Full-text search over the title and description of the seminars.
+
+On PostgreSQL the generated 'search_vector' column (see models.SEMINAR_SEARCH_DDL) is queried
+through its GIN index: the search text is parsed with 'websearch_to_tsquery' (words, "phrases",
+-excluded words, or) and the matches are ranked with 'ts_rank_cd', title matches weighing more
+than description matches. Other databases (the SQLite setups for development and tests) use an
+in-process inverted index, rebuilt whenever the version of the seminars table changes.
+
+Classes:
+- SeminarSearchIndex: In-process inverted index of the seminars.
+
+Functions:
+- search_seminars: Returns a ranked page of the seminars matching a search text.
+"""
+
+from sqlalchemy import literal_column
+from sqlalchemy.dialects.postgresql import websearch_to_tsquery
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.sql import func
+from collections import Counter, defaultdict
+from typing import List, Tuple
+from models import Seminar
+from schemas import SeminarOut
+import crud
+import math
+import re
+import threading
+
+SEARCH_CONFIG = "german"
+
+# Same weighting as ts_rank_cd with the default weights for 'A' (title) and 'B' (description)
+TITLE_WEIGHT = 1.0
+DESCRIPTION_WEIGHT = 0.4
+
+STOPWORDS = {
+    "aber", "als", "am", "an", "auch", "auf", "aus", "bei", "bis", "das", "dass", "dem", "den",
+    "der", "des", "die", "ein", "eine", "einem", "einen", "einer", "eines", "es", "für", "im",
+    "in", "ist", "mit", "nach", "nicht", "noch", "oder", "sich", "sie", "sind", "so", "über",
+    "um", "und", "uns", "von", "vor", "wie", "wir", "zu", "zum", "zur",
+}
+SUFFIXES = ("ern", "em", "en", "er", "es", "e", "s")
+UMLAUTS = str.maketrans({"ä": "a", "ö": "o", "ü": "u", "ß": "ss"})
+WORD = re.compile(r"\w+")
+
+
+# ---------------------------------------------------------------------------- #
+#                                  TOKENIZING                                  #
+# ---------------------------------------------------------------------------- #
+def _stem(word: str) -> str:
+    """
+    Very small German stemmer: folds umlauts and strips one inflection suffix, so that
+    e.g. 'Seminare', 'Seminaren' and 'Seminars' all become 'seminar'.
+    """
+    word = word.translate(UMLAUTS)
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split a text into lower case, stemmed terms without stopwords.
+    """
+    return [_stem(word) for word in WORD.findall(text.lower()) if word not in STOPWORDS]
+
+def _parse_query(q: str) -> Tuple[List[str], List[str]]:
+    """
+    Split a search text into required and excluded ('-word') terms.
+    """
+    required, excluded = [], []
+    for part in q.replace('"', " ").split():
+        target = excluded if part.startswith("-") else required
+        target.extend(tokenize(part))
+    return required, excluded
+
+
+# ---------------------------------------------------------------------------- #
+#                                INVERTED INDEX                                #
+# ---------------------------------------------------------------------------- #
+class SeminarSearchIndex:
+    """
+    Inverted index (term -> seminar -> weighted term frequency) of the seminar titles and
+    descriptions, used where the database has no full-text search.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._postings = {}         # term -> {seminar_id: weight}
+        self._order = {}            # seminar_id -> (date, seminar_id), tie-breaker of equal scores
+
+    def _refresh(self, db: Session):
+        version = crud.get_table_versions(db, "seminars")
+        if version == self._version:
+            return
+        with self._lock:
+            if version == self._version:
+                return
+            postings = defaultdict(dict)
+            order = {}
+            for seminar_id, title, description, seminar_date in db.query(
+                Seminar.seminar_id, Seminar.title, Seminar.description, Seminar.date
+            ):
+                weights = Counter()
+                for term in tokenize(title or ""):
+                    weights[term] += TITLE_WEIGHT
+                for term in tokenize(description or ""):
+                    weights[term] += DESCRIPTION_WEIGHT
+                for term, weight in weights.items():
+                    postings[term][seminar_id] = weight
+                order[seminar_id] = (seminar_date, seminar_id)
+            self._postings, self._order, self._version = dict(postings), order, version
+
+    def search(self, db: Session, q: str) -> List[int]:
+        """
+        Find the seminars containing all terms of the search text and none of the excluded ones.
+
+        Args:
+            db (Session): SQLAlchemy database session, used to rebuild an outdated index.
+            q (str): The search text.
+
+        Returns:
+            List[int]: IDs of the matching seminars, best match first (newest first on equal scores).
+        """
+        self._refresh(db)
+        postings, order = self._postings, self._order
+        required, excluded = _parse_query(q)
+        if not required:
+            return []
+
+        matches = [postings.get(term, {}) for term in required]
+        matches.sort(key=len)
+        ids = set(matches[0]).intersection(*matches[1:])
+        for term in excluded:
+            ids.difference_update(postings.get(term, {}))
+
+        # tf-idf: rare terms count more than terms found in most seminars
+        total = len(order) or 1
+        idf = [math.log(1 + total / len(match)) for match in matches if match]
+        scores = {
+            seminar_id: sum(match[seminar_id] * weight for match, weight in zip(matches, idf))
+            for seminar_id in ids
+        }
+        return sorted(ids, key=lambda seminar_id: (scores[seminar_id], order[seminar_id]), reverse=True)
+
+seminar_search_index = SeminarSearchIndex()
+
+
+# ---------------------------------------------------------------------------- #
+#                                    SEARCH                                    #
+# ---------------------------------------------------------------------------- #
+def search_seminars(db: Session, q: str, limit: int = 10, offset: int = 0) -> Tuple[List[SeminarOut], int]:
+    """
+    Search the title and description of the seminars.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        q (str): The search text, e.g. 'yoga anfänger -online'.
+        limit (int, optional): Maximum number of seminars to return. Defaults to 10.
+        offset (int, optional): Number of matches to skip (for pagination). Defaults to 0.
+
+    Returns:
+        Tuple[List[SeminarOut], int]: The page of matching seminars, best match first, and the total number of matches.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        search_vector = literal_column("seminars.search_vector")
+        query = websearch_to_tsquery(SEARCH_CONFIG, q)
+        matches = search_vector.op("@@")(query)
+
+        total = db.query(func.count(Seminar.seminar_id)).filter(matches).scalar()
+        seminars = (
+            db.query(Seminar)
+            .options(joinedload(Seminar.location))
+            .filter(matches)
+            .order_by(func.ts_rank_cd(search_vector, query).desc(), Seminar.date.desc(), Seminar.seminar_id.desc())
+            .offset(offset)
+            .limit(limit)
+            .all()
+        )
+        return [crud.to_seminar_out(seminar) for seminar in seminars], total
+
+    ids = seminar_search_index.search(db, q)
+    page = ids[offset:offset + limit]
+    seminars = {
+        seminar.seminar_id: seminar
+        for seminar in db.query(Seminar).options(joinedload(Seminar.location)).filter(Seminar.seminar_id.in_(page))
+    }
+    return [crud.to_seminar_out(seminars[seminar_id]) for seminar_id in page if seminar_id in seminars], len(ids)
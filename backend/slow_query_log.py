@@ -0,0 +1,172 @@
+"""
+slow_query_log.py
+
+Logs every SQL statement slower than SLOW_QUERY_THRESHOLD_MS, so missing indexes and queries
+degrading with growing tables are found from real traffic.
+
+Each slow statement is written as one JSON line to a rotating log file (SLOW_QUERY_LOG_FILE)
+with its duration, the statement, the engine and the route of the request that executed it.
+The parameters (names and email addresses of participants) are only logged with
+SLOW_QUERY_LOG_PARAMETERS=true. A sample of the slow SELECT statements (SLOW_QUERY_EXPLAIN_RATE) is
+explained on the same connection right away: PostgreSQL with 'EXPLAIN (ANALYZE, BUFFERS)',
+which runs the query a second time (set SLOW_QUERY_EXPLAIN_ANALYZE=false for the plan only)
+within a savepoint, so a failing EXPLAIN doesn't abort the request's transaction, SQLite
+with 'EXPLAIN QUERY PLAN'.
+
+Functions:
+- instrument_slow_queries: Registers the statement events on an engine.
+"""
+
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from datetime import datetime
+from metrics import current_route
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", 200))
+SLOW_QUERY_LOG_FILE = os.getenv("SLOW_QUERY_LOG_FILE", str(Path(__file__).resolve().parent / "logs" / "slow_queries.log"))
+SLOW_QUERY_LOG_MAX_BYTES = int(os.getenv("SLOW_QUERY_LOG_MAX_BYTES", 10 * 1024 * 1024))
+SLOW_QUERY_LOG_BACKUPS = int(os.getenv("SLOW_QUERY_LOG_BACKUPS", 5))
+SLOW_QUERY_LOG_PARAMETERS = os.getenv("SLOW_QUERY_LOG_PARAMETERS", "false").lower() in ("1", "true", "yes")  # may contain personal data
+SLOW_QUERY_EXPLAIN_RATE = float(os.getenv("SLOW_QUERY_EXPLAIN_RATE", 0.0))      # share of slow SELECTs explained, 0 to 1
+SLOW_QUERY_EXPLAIN_ANALYZE = os.getenv("SLOW_QUERY_EXPLAIN_ANALYZE", "true").lower() in ("1", "true", "yes")
+
+MAX_STATEMENT_LENGTH = 4000
+MAX_PARAMETER_LENGTH = 200
+# Only plain reads are explained, EXPLAIN ANALYZE executes the statement again
+EXPLAINABLE = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+LOCKING = re.compile(r"\bFOR\s+(UPDATE|SHARE|NO KEY UPDATE|KEY SHARE)\b", re.IGNORECASE)
+
+_log = logging.getLogger("slow_queries")
+_log.propagate = False
+_log_lock = threading.Lock()
+
+
+def _get_log() -> logging.Logger:
+    """
+    The JSON lines logger, the file is only created with the first slow statement.
+    """
+    if not _log.handlers:
+        with _log_lock:
+            if not _log.handlers:
+                path = Path(SLOW_QUERY_LOG_FILE)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                handler = RotatingFileHandler(path, maxBytes=SLOW_QUERY_LOG_MAX_BYTES,
+                                              backupCount=SLOW_QUERY_LOG_BACKUPS, encoding="utf-8")
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                _log.addHandler(handler)
+                _log.setLevel(logging.INFO)
+    return _log
+
+def _truncate(value, length: int) -> str:
+    text = value if isinstance(value, str) else repr(value)
+    return text if len(text) <= length else text[:length] + "..."
+
+def _format_parameters(parameters):
+    if isinstance(parameters, dict):
+        return {key: _truncate(value, MAX_PARAMETER_LENGTH) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_format_parameters(value) if isinstance(value, (dict, list, tuple)) else _truncate(value, MAX_PARAMETER_LENGTH)
+                for value in parameters[:50]]
+    return _truncate(parameters, MAX_PARAMETER_LENGTH)
+
+def _explain(conn, statement: str, parameters) -> list | str:
+    """
+    Explain a statement on the connection that just executed it (same transaction and parameters).
+    """
+    dialect = conn.dialect.name
+    if dialect == "postgresql":
+        options = "ANALYZE, BUFFERS, FORMAT JSON" if SLOW_QUERY_EXPLAIN_ANALYZE else "FORMAT JSON"
+        explain = f"EXPLAIN ({options}) {statement}"
+    elif dialect == "sqlite":
+        explain = f"EXPLAIN QUERY PLAN {statement}"
+    else:
+        explain = f"EXPLAIN {statement}"
+
+    dbapi_connection = conn.connection.dbapi_connection
+    # A failed statement (e.g. statement_timeout while EXPLAIN ANALYZE runs the query again) aborts
+    # the whole PostgreSQL transaction of the request, unless it's rolled back to a savepoint
+    savepoint = dialect == "postgresql" and not getattr(dbapi_connection, "autocommit", False)
+    cursor = dbapi_connection.cursor()
+    try:
+        if savepoint:
+            cursor.execute("SAVEPOINT slow_query_explain")
+        try:
+            cursor.execute(explain, parameters)
+            rows = cursor.fetchall()
+        except Exception:
+            if savepoint:
+                cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+                cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+            raise
+        if savepoint:
+            cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+    finally:
+        cursor.close()
+    if dialect == "postgresql":
+        plan = rows[0][0]
+        return json.loads(plan) if isinstance(plan, str) else plan
+    return [" ".join(str(column) for column in row) for row in rows]
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("slow_query_start", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - conn.info["slow_query_start"].pop()) * 1000
+    if elapsed_ms < SLOW_QUERY_THRESHOLD_MS:
+        return
+
+    entry = {
+        "timestamp": datetime.now().isoformat(timespec="milliseconds"),
+        "duration_ms": round(elapsed_ms, 2),
+        "threshold_ms": SLOW_QUERY_THRESHOLD_MS,
+        "route": current_route(),
+        "engine": conn.engine.url.render_as_string(hide_password=True),
+        "statement": _truncate(" ".join(statement.split()), MAX_STATEMENT_LENGTH),
+        "executemany": executemany,
+    }
+    if SLOW_QUERY_LOG_PARAMETERS:
+        entry["parameters"] = _format_parameters(parameters)
+
+    if (not executemany and SLOW_QUERY_EXPLAIN_RATE > 0 and random.random() < SLOW_QUERY_EXPLAIN_RATE
+            and EXPLAINABLE.match(statement) and not LOCKING.search(statement)):
+        try:
+            entry["explain"] = _explain(conn, statement, parameters)
+        except Exception as e:
+            entry["explain_error"] = f"{type(e).__name__}: {e}"
+
+    try:
+        _get_log().info(json.dumps(entry, default=str, ensure_ascii=False))
+    except Exception:
+        logger.exception("Writing the slow query log failed")
+
+def _handle_error(context):
+    starts = context.connection.info.get("slow_query_start") if context.connection is not None else None
+    if starts:
+        starts.pop()
+
+def instrument_slow_queries(engine: Engine):
+    """
+    Log the slow statements of an engine.
+
+    Args:
+        engine (Engine): The (sync) engine, for async engines 'async_engine.sync_engine'.
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
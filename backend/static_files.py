@@ -0,0 +1,218 @@
+"""
+static_files.py
+
+Serves the built React frontend (frontend/dist) with precompressed assets and cache headers.
+
+Text assets (the JS bundle, CSS, SVG, ...) are compressed once with gzip and, if the 'brotli'
+package is installed, brotli and the best variant the browser accepts is served (Accept-Encoding).
+Variants created at build time ('python static_files.py ../frontend/dist' writes '.gz' and '.br'
+files next to the assets) are used as they are, missing ones are created in memory at startup.
+
+Files with a content hash in their name (Vite's 'assets/name-<hash>.ext') never change, so they
+are cached by browsers for a year without revalidation. index.html is kept in memory and served
+for every unknown path without file extension, so deep links of the single page app work.
+
+Classes:
+- PrecompressedStaticFiles: StaticFiles with precompressed variants, cache headers and SPA fallback.
+
+Functions:
+- precompress_directory: Writes the compressed variants of all text assets (build time).
+"""
+
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+from starlette.types import Scope
+from pathlib import Path
+import gzip
+import hashlib
+import logging
+import os
+import re
+import sys
+from dotenv import load_dotenv
+
+try:
+    import brotli
+except ImportError:     # brotli is optional, gzip is always available
+    brotli = None
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+STATIC_PRECOMPRESS = os.getenv("STATIC_PRECOMPRESS", "true").lower() in ("1", "true", "yes")
+STATIC_CACHE_CONTROL = os.getenv("STATIC_CACHE_CONTROL", "public, max-age=3600")     # files without content hash
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+INDEX_CACHE_CONTROL = "no-cache"
+
+COMPRESSIBLE_EXTENSIONS = {".js", ".mjs", ".css", ".html", ".svg", ".json", ".map", ".txt", ".xml", ".ico", ".webmanifest"}
+MIN_COMPRESS_SIZE = 1024            # bytes, smaller files are served as they are
+FINGERPRINT = re.compile(r"-[A-Za-z0-9_-]{8}\.[A-Za-z0-9]+$")
+# Preferred first
+ENCODINGS = {"br": ".br", "gzip": ".gz"}
+
+
+def _compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=11)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+def _available_encodings() -> list[str]:
+    return [encoding for encoding in ENCODINGS if encoding != "br" or brotli is not None]
+
+def _is_compressible(path: Path) -> bool:
+    return path.suffix in COMPRESSIBLE_EXTENSIONS and path.stat().st_size >= MIN_COMPRESS_SIZE
+
+def _accepted_encodings(headers: Headers) -> set[str]:
+    """
+    Content codings accepted by the client (q > 0) according to the Accept-Encoding header.
+    """
+    accepted = set()
+    for part in headers.get("accept-encoding", "").split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = params.strip().removeprefix("q=")
+        try:
+            if params and float(quality) <= 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+def precompress_directory(directory: str) -> int:
+    """
+    Write a '.gz' (and '.br') variant next to every text asset in the directory,
+    e.g. after 'npm run build'.
+
+    Args:
+        directory (str): The build directory, e.g. '../frontend/dist'.
+
+    Returns:
+        int: Number of written files.
+    """
+    written = 0
+    for path in Path(directory).rglob("*"):
+        if not path.is_file() or not _is_compressible(path):
+            continue
+        data = path.read_bytes()
+        for encoding in _available_encodings():
+            path.with_name(path.name + ENCODINGS[encoding]).write_bytes(_compress(data, encoding))
+            written += 1
+    return written
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles serving precompressed variants, long-lived cache headers for fingerprinted
+    files and index.html from memory as fallback for the routes of the single page app.
+    """
+
+    def __init__(self, *, directory: str, index: str = "index.html", precompress: bool = STATIC_PRECOMPRESS, **kwargs):
+        super().__init__(directory=directory, html=True, **kwargs)
+        self.root = Path(directory).resolve()
+        self._variants = {}         # absolute path -> {encoding: compressed bytes}
+        if precompress:
+            self._load_variants()
+
+        # index.html with its variants, served from memory
+        index_path = self.root / index
+        self._index_path = str(index_path)
+        self._index = index_path.read_bytes() if index_path.is_file() else None
+        if self._index is not None:
+            self._index_etag = '"' + hashlib.sha1(self._index).hexdigest() + '"'
+            self._variants.setdefault(self._index_path, {
+                encoding: _compress(self._index, encoding) for encoding in _available_encodings()
+            })
+
+    def _load_variants(self):
+        """
+        Use the variants created at build time, compress the missing ones in memory.
+        """
+        compressed = 0
+        for path in self.root.rglob("*"):
+            if not path.is_file() or not _is_compressible(path):
+                continue
+            variants = {}
+            data = None
+            for encoding in _available_encodings():
+                prebuilt = path.with_name(path.name + ENCODINGS[encoding])
+                if prebuilt.is_file() and prebuilt.stat().st_mtime >= path.stat().st_mtime:
+                    variants[encoding] = prebuilt.read_bytes()
+                    continue
+                if data is None:
+                    data = path.read_bytes()
+                variants[encoding] = _compress(data, encoding)
+                compressed += 1
+            self._variants[str(path)] = variants
+        if compressed:
+            logger.info("Compressed %d static file variant(s) at startup, run static_files.py after the build to skip this.", compressed)
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        try:
+            return await super().get_response(path, scope)
+        except HTTPException as exc:
+            # Client side route of the single page app (e.g. /seminare/3), not a missing asset
+            if exc.status_code == 404 and self._index is not None and "." not in path.rsplit("/", 1)[-1]:
+                return self._index_response(scope)
+            raise
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope, status_code: int = 200) -> Response:
+        full_path = str(Path(full_path).resolve())
+        if full_path == self._index_path and self._index is not None:
+            return self._index_response(scope)
+
+        request_headers = Headers(scope=scope)
+        cache_control = IMMUTABLE_CACHE_CONTROL if FINGERPRINT.search(full_path) else STATIC_CACHE_CONTROL
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+        response.headers["Cache-Control"] = cache_control
+
+        variants = self._variants.get(full_path)
+        if variants:
+            response.headers["Vary"] = "Accept-Encoding"
+            encoding = self._negotiate(variants, request_headers)
+            if encoding is not None:
+                # Every representation needs its own ETag
+                etag = response.headers["etag"][:-1] + f'-{encoding}"'
+                response = Response(variants[encoding], status_code=status_code, media_type=response.media_type, headers={
+                    "Content-Encoding": encoding,
+                    "Vary": "Accept-Encoding",
+                    "Cache-Control": cache_control,
+                    "ETag": etag,
+                    "Last-Modified": response.headers["last-modified"],
+                })
+
+        if self.is_not_modified(response.headers, request_headers):
+            return Response(status_code=304, headers={
+                key: value for key, value in response.headers.items()
+                if key in ("etag", "cache-control", "vary", "last-modified")
+            })
+        return response
+
+    def _negotiate(self, variants: dict, request_headers: Headers) -> str | None:
+        accepted = _accepted_encodings(request_headers)
+        for encoding in ENCODINGS:
+            if encoding in variants and encoding in accepted:
+                return encoding
+        return None
+
+    def _index_response(self, scope: Scope) -> Response:
+        request_headers = Headers(scope=scope)
+        variants = self._variants[self._index_path]
+        encoding = self._negotiate(variants, request_headers)
+        etag = self._index_etag if encoding is None else self._index_etag[:-1] + f'-{encoding}"'
+        headers = {"ETag": etag, "Cache-Control": INDEX_CACHE_CONTROL, "Vary": "Accept-Encoding"}
+
+        if self.is_not_modified(Headers(headers), request_headers):
+            return Response(status_code=304, headers=headers)
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+            return Response(variants[encoding], media_type="text/html", headers=headers)
+        return Response(self._index, media_type="text/html", headers=headers)
+
+
+if __name__ == "__main__":
+    directory = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), "../frontend/dist")
+    print(f"successfully wrote {precompress_directory(directory)} compressed file(s)")
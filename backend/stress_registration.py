@@ -0,0 +1,78 @@
+"""
+stress_registration.py
+
+Concurrency stress test of the seminar registration. Creates a seminar with a small capacity,
+fires many registrations at it in parallel and checks that it is never overbooked.
+
+Run it against a running development server that uses the same database (DB_URL), with a
+local SMTP sink configured and the rate limits turned off (all registrations come from one
+address, so the registration limit would reject them), e.g.:
+    RATELIMIT_ENABLED=false uvicorn main:app --port 8000
+    python stress_registration.py --url http://localhost:8000 --requests 300 --capacity 20
+"""
+
+from datetime import date, time, timedelta
+from database import SessionLocal
+import models
+import argparse
+import asyncio
+import collections
+import httpx
+
+parser = argparse.ArgumentParser(description="Fire parallel registrations at one seminar.")
+parser.add_argument("--url", default="http://localhost:8000", help="Base URL of the running backend")
+parser.add_argument("--requests", type=int, default=300, help="Number of parallel registrations")
+parser.add_argument("--capacity", type=int, default=20, help="max_participants of the test seminar")
+args = parser.parse_args()
+
+# Test seminar in the future, so the registration is open
+with SessionLocal() as db:
+    location = models.Location(name="Stress test", street="Teststraße", house_number=1, zip_code=12345, city="Test")
+    db.add(location)
+    db.flush()
+    seminar = models.Seminar(
+        title="Stress test",
+        description="Created by stress_registration.py",
+        date=date.today() + timedelta(days=30),
+        time=time(10),
+        max_participants=args.capacity,
+        location_id=location.location_id,
+    )
+    db.add(seminar)
+    db.commit()
+    seminar_id = seminar.seminar_id
+    location_id = location.location_id
+
+async def register(client: httpx.AsyncClient, number: int) -> int:
+    response = await client.post(
+        f"{args.url}/seminars/{seminar_id}/register",
+        json={"firstname": "Stress", "lastname": str(number), "email": f"stress{number}@example.com", "remarks": ""},
+    )
+    return response.status_code
+
+async def main():
+    async with httpx.AsyncClient(verify=False, timeout=60, limits=httpx.Limits(max_connections=args.requests)) as client:
+        return await asyncio.gather(*(register(client, number) for number in range(args.requests)))
+
+statuses = collections.Counter(asyncio.run(main()))
+
+with SessionLocal() as db:
+    seminar = db.get(models.Seminar, seminar_id)
+    participants = db.query(models.Participant).filter(models.Participant.seminar_id == seminar_id).count()
+    counter = seminar.participants_count
+    # SQLite doesn't cascade the delete to the participants without 'PRAGMA foreign_keys'
+    db.query(models.Participant).filter(models.Participant.seminar_id == seminar_id).delete(synchronize_session=False)
+    db.delete(seminar)
+    db.delete(db.get(models.Location, location_id))
+    db.commit()
+
+print(f"responses: {dict(statuses)}")
+print(f"capacity: {args.capacity}, participants: {participants}, participants_count: {counter}")
+
+assert participants <= args.capacity, "seminar is overbooked"
+assert not statuses[429], "registrations were rate limited, start the server with RATELIMIT_ENABLED=false"
+assert counter == participants, "participants_count is out of sync"
+assert statuses[200] == participants, "successful registrations don't match the participants"
+assert set(statuses) <= {200, 409}, "unexpected responses, check the server log"
+assert participants == min(args.capacity, args.requests), "seminar was not fully booked"
+print("successfully verified that the seminar was not overbooked")
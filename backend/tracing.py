@@ -0,0 +1,283 @@
+"""
+tracing.py
+
+Lightweight request tracing with a local JSON lines exporter, no collector needed.
+
+A sampled request (TRACE_SAMPLE_RATE) gets a root span covering the whole request and child
+spans for every SQL statement, every participant list or certificate render and, in the
+outbox worker, every SMTP connection and sent email. When the root span ends, all spans of
+the trace are appended to TRACE_FILE (rotated at TRACE_MAX_BYTES), one JSON object per span:
+
+    {"trace_id": ..., "span_id": ..., "parent_id": ..., "name": "sql", "start": <unix time>,
+     "duration_ms": 1.3, "attributes": {...}, "error": null}
+
+Sampled responses carry the trace ID in the 'X-Trace-Id' header, so a slow request seen in
+the browser can be looked up in the file. Unsampled requests only pay for one random number.
+
+Classes:
+- Span: A timed operation of a trace.
+- TracingMiddleware: ASGI middleware starting a (sampled) trace for every HTTP request.
+
+Functions:
+- trace: Context manager starting a new (sampled) trace, e.g. in a background worker.
+- span: Context manager adding a child span to the current trace (no-op without one).
+- instrument_tracing: Registers the SQL statement spans on an engine.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import json
+import logging
+import os
+import random
+import secrets
+import threading
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", 0.0))     # share of traced requests, 0 to 1
+TRACE_FILE = os.getenv("TRACE_FILE", str(Path(__file__).resolve().parent / "logs" / "traces.jsonl"))
+TRACE_MAX_BYTES = int(os.getenv("TRACE_MAX_BYTES", 50 * 1024 * 1024))
+TRACE_BACKUPS = int(os.getenv("TRACE_BACKUPS", 3))
+TRACE_MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", 1000))         # per trace, further spans are dropped
+
+MAX_STATEMENT_LENGTH = 1000
+
+_exporter = logging.getLogger("traces")
+_exporter.propagate = False
+_exporter_lock = threading.Lock()
+
+
+class _Trace:
+    """
+    The finished spans of one trace, collected until the root span ends.
+    """
+
+    def __init__(self):
+        self.trace_id = secrets.token_hex(16)
+        self.spans = []
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def add(self, span: "Span"):
+        with self._lock:
+            if len(self.spans) < TRACE_MAX_SPANS:
+                self.spans.append(span)
+            else:
+                self.dropped += 1
+
+
+class Span:
+    """
+    A timed operation. Created by 'trace' and 'span', attributes can be added while it runs.
+    """
+    __slots__ = ("trace", "span_id", "parent_id", "name", "attributes", "start", "duration", "error", "_started")
+
+    def __init__(self, trace: _Trace, name: str, parent_id: str | None, attributes: dict):
+        self.trace = trace
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.start = time.time()
+        self._started = time.perf_counter()
+        self.duration = None
+        self.error = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def end(self, error: BaseException | None = None):
+        self.duration = time.perf_counter() - self._started
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        self.trace.add(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": round(self.start, 6),
+            "duration_ms": round(self.duration * 1000, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+def _get_exporter() -> logging.Logger:
+    """
+    The JSON lines logger, the file is only created with the first trace.
+    """
+    if not _exporter.handlers:
+        with _exporter_lock:
+            if not _exporter.handlers:
+                path = Path(TRACE_FILE)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                handler = RotatingFileHandler(path, maxBytes=TRACE_MAX_BYTES, backupCount=TRACE_BACKUPS, encoding="utf-8")
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                _exporter.addHandler(handler)
+                _exporter.setLevel(logging.INFO)
+    return _exporter
+
+def _export(trace: _Trace):
+    with trace._lock:
+        spans = sorted(trace.spans, key=lambda span: span.start)
+        if trace.dropped:
+            spans[0].attributes["dropped_spans"] = trace.dropped
+    try:
+        # One write per trace, so the spans of a trace stay together
+        _get_exporter().info("\n".join(json.dumps(span.to_dict(), default=str, ensure_ascii=False) for span in spans))
+    except Exception:
+        logger.exception("Exporting a trace failed")
+
+
+@contextmanager
+def trace(name: str, sample_rate: float | None = None, **attributes):
+    """
+    Start a new trace with a root span, if it's sampled. All spans of the trace are exported
+    when the block ends.
+
+    Args:
+        name (str): Name of the root span, e.g. 'outbox.deliver'.
+        sample_rate (float, optional): Probability that the trace is recorded. Defaults to TRACE_SAMPLE_RATE.
+        **attributes: Attributes of the root span.
+
+    Yields:
+        Span | None: The root span, None if the trace isn't sampled.
+    """
+    rate = TRACE_SAMPLE_RATE if sample_rate is None else sample_rate
+    if rate <= 0 or random.random() >= rate:
+        yield None
+        return
+
+    root = Span(_Trace(), name, None, attributes)
+    token = _current_span.set(root)
+    error = None
+    try:
+        yield root
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        _current_span.reset(token)
+        root.end(error)
+        _export(root.trace)
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Record a child span of the current span. Does nothing outside of a sampled trace.
+
+    Args:
+        name (str): Name of the span, e.g. 'pdf.render'.
+        **attributes: Attributes of the span.
+
+    Yields:
+        Span | None: The span, None without a sampled trace.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+
+    child = Span(parent.trace, name, parent.span_id, attributes)
+    token = _current_span.set(child)
+    error = None
+    try:
+        yield child
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        _current_span.reset(token)
+        child.end(error)
+
+
+# ---------------------------------------------------------------------------- #
+#                                   SQL SPANS                                  #
+# ---------------------------------------------------------------------------- #
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    parent = _current_span.get()
+    if parent is None:
+        conn.info.setdefault("trace_spans", []).append(None)
+        return
+    statement = " ".join(statement.split())
+    conn.info.setdefault("trace_spans", []).append(Span(parent.trace, "sql", parent.span_id, {
+        "db.system": conn.dialect.name,
+        "db.statement": statement[:MAX_STATEMENT_LENGTH],
+        "db.executemany": executemany,
+    }))
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    sql_span = conn.info["trace_spans"].pop()
+    if sql_span is not None:
+        if cursor.rowcount is not None and cursor.rowcount >= 0:
+            sql_span.set(**{"db.rowcount": cursor.rowcount})
+        sql_span.end()
+
+def _handle_error(context):
+    spans = context.connection.info.get("trace_spans") if context.connection is not None else None
+    if spans:
+        sql_span = spans.pop()
+        if sql_span is not None:
+            sql_span.end(context.original_exception)
+
+def instrument_tracing(engine: Engine):
+    """
+    Record a span for every statement of an engine executed within a sampled trace.
+
+    Args:
+        engine (Engine): The (sync) engine, for async engines 'async_engine.sync_engine'.
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+# ---------------------------------------------------------------------------- #
+#                                  MIDDLEWARE                                  #
+# ---------------------------------------------------------------------------- #
+class TracingMiddleware:
+    """
+    ASGI middleware wrapping every sampled HTTP request in a root span.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        with trace("http.request", **{"http.method": scope["method"], "http.path": scope["path"]}) as root:
+            if root is None:
+                return await self.app(scope, receive, send)
+
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    root.set(**{"http.status_code": message["status"]})
+                    message.setdefault("headers", [])
+                    message["headers"] = [*message["headers"], (b"x-trace-id", root.trace.trace_id.encode())]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = scope.get("route")
+                if route is not None:
+                    root.name = f"{scope['method']} {route.path}"
+                    root.set(**{"http.route": route.path})